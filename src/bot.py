@@ -37,9 +37,11 @@ from playwright.async_api import Browser, Playwright, async_playwright
 from src.constants import GLOBAL_LEADERBOARD_ID, ProblemList
 from src.database.models import Profile, Server
 from src.database.setup import initialise_mongodb_connection
+from src.utils.catalogue import ProblemCatalogue
 from src.utils.channel_logging import DiscordChannelLogger
 from src.utils.dev import dev_commands
 from src.utils.http_client import HttpClient
+from src.utils.leaderboard_snapshots import invalidate_leaderboard_snapshots
 from src.utils.neetcode import NeetcodeSolutions
 from src.utils.ratings import Ratings
 from src.utils.schedules import TASKS_TO_SCHEDULE
@@ -78,6 +80,7 @@ class DiscordBot(commands.AutoShardedBot):
         self.channel_logger = DiscordChannelLogger(self, self.config.LOGGING_CHANNEL_ID)
         self.ratings = Ratings(self)
         self.neetcode = NeetcodeSolutions(self)
+        self.catalogue = ProblemCatalogue(self)
         # {problem_list: {problem_id,}}
         self.problem_lists: DefaultDict[ProblemList, set[str]] = defaultdict(set)
 
@@ -167,7 +170,7 @@ class DiscordBot(commands.AutoShardedBot):
 
         self._http_client = HttpClient(self, aiohttp.ClientSession())
         await initialise_mongodb_connection(
-            self.config.MONGODB_URI, GLOBAL_LEADERBOARD_ID
+            self.config.MONGODB_URI, GLOBAL_LEADERBOARD_ID, self.logger
         )
 
         self._playwright = await async_playwright().start()
@@ -236,6 +239,7 @@ class DiscordBot(commands.AutoShardedBot):
         """
         await Profile.find_many(Profile.server_id == guild.id).delete()
         await Server.find_one(Server.id == guild.id).delete()
+        await invalidate_leaderboard_snapshots(guild.id)
 
         statsd.increment("discord.guilds.removed")
 
@@ -33,6 +33,7 @@ class LeaderboardsCog(commands.Cog):
     @app_commands.command(name="leaderboard")
     @app_commands.rename(global_leaderboard="global")
     @app_commands.rename(sort_by="sorting")
+    @app_commands.rename(centre_on_me="jump_to_me")
     @defer_interaction(user_preferences_prompt=True)
     @ensure_server_document
     async def leaderboard(
@@ -41,6 +42,7 @@ class LeaderboardsCog(commands.Cog):
         timeframe: TimeFrameField,
         global_leaderboard: BooleanField = BooleanField.No,
         sort_by: SortByField = SortByField.Score,
+        centre_on_me: BooleanField = BooleanField.No,
     ) -> None:
         """
         View the leaderboard
@@ -48,6 +50,7 @@ class LeaderboardsCog(commands.Cog):
         :param timeframe: Timeframe for the leaderboard
         :param global_leaderboard: Whether to display the global leaderboard
         :param sort_by: The sorting method
+        :param centre_on_me: Whether to open the page you are on
         """
         guild_id = cast(int, interaction.guild_id)
 
@@ -58,6 +61,7 @@ class LeaderboardsCog(commands.Cog):
             author_user_id=interaction.user.id,
             global_leaderboard=global_leaderboard.to_bool,
             page=1,
+            centre_on_author=centre_on_me.to_bool,
         )
 
         await interaction.followup.send(embed=embed, view=view)  # type: ignore
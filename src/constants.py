@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from datetime import timedelta
 from enum import Enum
 
 import discord
@@ -29,6 +30,19 @@ class Difficulty(Enum):
     RANDOM = 4
 
 
+class RefreshPhase(Enum):
+    DAILY_QUESTION = "daily_question"
+    STATS = "stats"
+    WINS = "wins"
+    WINNERS = "winners"
+    ROLES = "roles"
+
+
+class RequestPriority(Enum):
+    INTERACTIVE = "interactive"
+    BACKGROUND = "background"
+
+
 class RankEmoji(Enum):
     FIRST = "🥇"
     SECOND = "🥈"
@@ -80,6 +94,23 @@ class NotificationOptions(Enum):
     WINNERS = "winners"
 
 
+# Number of broadcasts in a row a notification channel can fail to be delivered to
+# before it's removed.
+CHANNEL_FAILURE_LIMIT = 3
+
+# Permissions the bot needs in a channel to deliver each notification. Announcements
+# are plain text, and the daily question's thread is optional.
+NOTIFICATION_PERMISSIONS = {
+    NotificationOptions.MAINTENANCE: discord.Permissions(send_messages=True),
+    NotificationOptions.DAILY_QUESTION: discord.Permissions(
+        send_messages=True, embed_links=True
+    ),
+    NotificationOptions.WINNERS: discord.Permissions(
+        send_messages=True, embed_links=True
+    ),
+}
+
+
 class CodeGrindMilestone(Enum):
     NOVICE = "Novice"
     APPRENTICE = "Apprentice"
@@ -108,8 +139,43 @@ class CodeGrindTierInfo:
     icon_path: str | None = None
 
 
+@dataclass
+class RefreshTier:
+    name: str
+    # Minimum time since the user's score last changed to fall into the tier.
+    inactive_for: timedelta
+    # How often the stats of users in the tier are refreshed.
+    interval: timedelta
+
+
 GLOBAL_LEADERBOARD_ID = 0
 
+# Ordered from most to least active.
+REFRESH_TIERS = (
+    RefreshTier(
+        name="active", inactive_for=timedelta(0), interval=timedelta(minutes=30)
+    ),
+    RefreshTier(
+        name="dormant", inactive_for=timedelta(days=3), interval=timedelta(hours=4)
+    ),
+    RefreshTier(
+        name="inactive", inactive_for=timedelta(days=30), interval=timedelta(days=1)
+    ),
+)
+
+# Daily records are kept for this long, after which they are compacted into weekly and
+# monthly rollups. Leaderboards are computed from the daily records, so this must cover
+# the previous month.
+RECORD_RETENTION = timedelta(days=93)
+# Weekly rollups are kept for this long, after which only monthly rollups remain.
+WEEKLY_ROLLUP_RETENTION = timedelta(days=365)
+# Compacted records are deleted by their timestamp, which time series collections only
+# allow from MongoDB 7.0. Older servers can only delete by the meta field.
+RECORD_COMPACTION_MIN_MONGODB_VERSION = (7, 0)
+# Finished refresh jobs are kept for this long, which must cover a month so that a
+# missed monthly reset can be detected.
+REFRESH_JOB_RETENTION = timedelta(days=62)
+
 # Threshold is in points.
 MILESTONE_ROLES = {
     CodeGrindMilestone.NOVICE: CodeGrindTierInfo(
@@ -0,0 +1,115 @@
+"""
+Compares the query plans of the bot's hot queries with and without the declared
+indexes.
+
+Each query is explained twice: once forced to a collection scan, as it would run
+without any secondary indexes, and once as the query planner chooses. Other than
+creating any missing indexes on startup, only reads are issued:
+
+    python -m src.database.index_benchmark
+"""
+
+import os
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from src.constants import GLOBAL_LEADERBOARD_ID
+from src.database.models import Profile, Record, User
+
+
+def summarise_plan(explanation: dict[str, Any]) -> str:
+    """
+    Summarise the winning plan of an explained query.
+
+    :param explanation: The output of `explain`.
+
+    :return: The plan's stages, and the keys and documents it examined.
+    """
+    stages = []
+    stage = explanation["queryPlanner"]["winningPlan"]
+    # Time series collections wrap the plan of the underlying buckets collection.
+    stage = stage.get("queryPlan", stage)
+    while stage:
+        stages.append(
+            stage["stage"] + (f" {stage['indexName']}" if "indexName" in stage else "")
+        )
+        stage = stage.get("inputStage")
+
+    execution_stats = explanation.get("executionStats", {})
+    return (
+        f"{' <- '.join(stages)} | "
+        f"Keys examined: {execution_stats.get('totalKeysExamined')} | "
+        f"Docs examined: {execution_stats.get('totalDocsExamined')} | "
+        f"Time: {execution_stats.get('executionTimeMillis')} ms"
+    )
+
+
+async def explain(
+    collection: AsyncIOMotorCollection, query: dict[str, Any], scan: bool
+) -> str:
+    """
+    Explain a query.
+
+    :param collection: The collection to query.
+    :param query: The query filter.
+    :param scan: Whether to force a collection scan.
+
+    :return: The summarised winning plan.
+    """
+    cursor = collection.find(query)
+    if scan:
+        cursor = cursor.hint([("$natural", 1)])
+
+    return summarise_plan(await cursor.explain())
+
+
+async def run_benchmark() -> None:
+    """
+    Print the query plans of the hot queries, without and with the indexes.
+    """
+    db_profile = await Profile.find_one(Profile.server_id != GLOBAL_LEADERBOARD_ID)
+    if not db_profile:
+        print("No profiles to benchmark with")
+        return
+
+    month_ago = datetime.now(UTC) - timedelta(days=31)
+
+    queries = [
+        (
+            "Profile by server and user",
+            Profile,
+            {"server_id": db_profile.server_id, "user_id": db_profile.user_id},
+        ),
+        ("Profiles by server", Profile, {"server_id": db_profile.server_id}),
+        ("Profiles by user", Profile, {"user_id": db_profile.user_id}),
+        (
+            "Records by user and time range",
+            Record,
+            {"user_id": db_profile.user_id, "timestamp": {"$gte": month_ago}},
+        ),
+        ("Users due for refresh", User, {"score_last_changed": {"$lte": month_ago}}),
+    ]
+
+    for name, document_model, query in queries:
+        collection = document_model.get_motor_collection()
+
+        print(name)
+        print(f"  Before: {await explain(collection, query, scan=True)}")
+        print(f"  After:  {await explain(collection, query, scan=False)}")
+
+
+if __name__ == "__main__":
+    import asyncio
+
+    from dotenv import find_dotenv, load_dotenv
+
+    from src.database.setup import initialise_mongodb_connection
+
+    async def main() -> None:
+        load_dotenv(find_dotenv())
+        await initialise_mongodb_connection(os.getenv("MONGODB_URI"))  # type: ignore
+        await run_benchmark()
+
+    asyncio.run(main())
@@ -1,8 +1,13 @@
-from .profile import Preference, Profile, WinCount
+from .leaderboard_snapshot import LeaderboardSnapshot, LeaderboardSnapshotChunk
+from .profile import AppliedRoles, Preference, Profile, WinCount
 from .record import Record
+from .record_rollup import RecordRollup
+from .refresh_job import RefreshJob
 from .server import Channels, Server
 from .user import (
+    Breakdown,
     LanguageProblemCount,
+    PeriodScores,
     SkillProblemCount,
     SkillsProblemCount,
     Stats,
@@ -25,4 +30,11 @@ __all__ = [
     "LanguageProblemCount",
     "SkillProblemCount",
     "SkillsProblemCount",
+    "LeaderboardSnapshot",
+    "LeaderboardSnapshotChunk",
+    "PeriodScores",
+    "RecordRollup",
+    "Breakdown",
+    "AppliedRoles",
+    "RefreshJob",
 ]
@@ -0,0 +1,76 @@
+from datetime import UTC, datetime
+
+from beanie import Document
+from pydantic import Field
+from pymongo import ASCENDING, IndexModel
+
+from src.constants import LeaderboardSortBy, Period
+
+
+class LeaderboardSnapshot(Document):
+    server_id: int
+    period: Period
+    previous: bool
+    sort_by: LeaderboardSortBy
+
+    # Start of the period the snapshot was computed in, used to discard snapshots once
+    # the period has rolled over. None for all-time leaderboards.
+    period_start: datetime | None = None
+
+    # The ranking is split across `LeaderboardSnapshotChunk` documents, as a large
+    # ranking doesn't fit in a single document. The generation identifies the chunks
+    # of the latest ranking, so that a new ranking replaces the old one at once.
+    generation: str | None = None
+    chunks: int = 0
+
+    generated_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+
+    class Settings:
+        name = "leaderboard_snapshots"
+        indexes = [
+            IndexModel(
+                [
+                    ("server_id", ASCENDING),
+                    ("period", ASCENDING),
+                    ("previous", ASCENDING),
+                    ("sort_by", ASCENDING),
+                ],
+                unique=True,
+            )
+        ]
+
+
+class LeaderboardSnapshotChunk(Document):
+    # The leaderboard the chunk belongs to, see `LeaderboardSnapshot`.
+    server_id: int
+    period: Period
+    previous: bool
+    sort_by: LeaderboardSortBy
+    generation: str
+    # Position of the chunk in the ranking.
+    index: int
+
+    # Consecutive slices of the ranking's parallel buffers of signed 64-bit integers,
+    # see `LeaderboardRanking`.
+    user_ids: bytes = b""
+    scores: bytes = b""
+    win_counts: bytes = b""
+    places: bytes = b""
+    sorted_user_ids: bytes = b""
+    sorted_positions: bytes = b""
+
+    class Settings:
+        name = "leaderboard_snapshot_chunks"
+        indexes = [
+            # Used to load a snapshot's chunks in order.
+            IndexModel([("generation", ASCENDING), ("index", ASCENDING)], unique=True),
+            # Used to delete the chunks of a server's leaderboards.
+            IndexModel(
+                [
+                    ("server_id", ASCENDING),
+                    ("period", ASCENDING),
+                    ("previous", ASCENDING),
+                    ("sort_by", ASCENDING),
+                ]
+            ),
+        ]
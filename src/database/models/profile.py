@@ -1,7 +1,8 @@
 from datetime import UTC, datetime
 
-from beanie import Document, Indexed
+from beanie import Document
 from pydantic import Field, BaseModel
+from pymongo import ASCENDING, IndexModel
 
 
 class Preference(BaseModel):
@@ -20,13 +21,33 @@ class WinCount(BaseModel):
     last_updated: datetime = Field(default_factory=lambda: datetime.now(UTC))
 
 
+class AppliedRoles(BaseModel):
+    # Thresholds of the highest tiers whose roles were last given to the member, or 0
+    # if they hadn't reached any tier.
+    milestone_tier: int = 0
+    streak_tier: int = 0
+
+    last_updated: datetime = Field(default_factory=lambda: datetime.now(UTC))
+
+
 class Profile(Document):
-    user_id: Indexed(int)  # type: ignore
-    server_id: Indexed(int)  # type: ignore
+    user_id: int
+    server_id: int
 
     preference: Preference
     win_count: WinCount = Field(default_factory=WinCount)
+    # None until the member's roles are first updated.
+    applied_roles: AppliedRoles | None = None
 
     class Settings:
         name = "profiles"
         use_state_management = True
+        indexes = [
+            # A user has at most one profile per server. Also serves queries on the
+            # server alone, as it's the index's prefix.
+            IndexModel(
+                [("server_id", ASCENDING), ("user_id", ASCENDING)],
+                unique=True,
+            ),
+            IndexModel([("user_id", ASCENDING)]),
+        ]
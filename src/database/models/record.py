@@ -3,6 +3,7 @@ from typing import List
 
 from pydantic import Field
 from beanie import Document, Granularity, TimeSeriesConfig
+from pymongo import ASCENDING, IndexModel
 
 from .user import LanguageProblemCount, SkillsProblemCount, Submissions
 
@@ -12,6 +13,10 @@ class Record(Document):
     user_id: int
 
     submissions: Submissions
+
+    # Keyframes hold the full breakdowns. Other records only hold the entries that
+    # changed since the previous record, with a count of 0 for removed entries.
+    keyframe: bool = True
     languages_problem_count: List[LanguageProblemCount] = Field(default_factory=list)
     skills_problem_count: SkillsProblemCount = Field(default_factory=SkillsProblemCount)
 
@@ -22,3 +27,9 @@ class Record(Document):
             meta_field="user_id",
             granularity=Granularity.hours,
         )
+        indexes = [
+            # Record queries look up a user's records within a time range.
+            IndexModel(
+                [("user_id", ASCENDING), ("timestamp", ASCENDING)],
+            ),
+        ]
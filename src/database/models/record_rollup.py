@@ -0,0 +1,39 @@
+from datetime import datetime
+
+from beanie import Document
+from pymongo import ASCENDING, IndexModel
+
+from src.constants import Period
+
+from .user import Submissions
+
+
+class RecordRollup(Document):
+    """
+    A summary of a user's daily records within a week or month, kept once the daily
+    records have been compacted.
+    """
+
+    user_id: int
+    # Period.WEEK or Period.MONTH.
+    period: Period
+    period_start: datetime
+
+    # The first and last daily record of the period.
+    first_timestamp: datetime
+    first_score: int
+    last_timestamp: datetime
+    last_submissions: Submissions
+
+    class Settings:
+        name = "record_rollups"
+        indexes = [
+            IndexModel(
+                [
+                    ("user_id", ASCENDING),
+                    ("period", ASCENDING),
+                    ("period_start", ASCENDING),
+                ],
+                unique=True,
+            )
+        ]
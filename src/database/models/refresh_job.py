@@ -0,0 +1,37 @@
+from datetime import datetime
+
+from beanie import Document
+from pydantic import Field
+from pymongo import ASCENDING, IndexModel
+
+from src.constants import RefreshPhase
+
+
+class RefreshJob(Document):
+    """
+    A run of the daily question and stats refresh, persisted so that a run interrupted
+    by a restart is resumed rather than redone or skipped.
+    """
+
+    started_at: datetime
+    reset_day: bool = False
+    reset_week: bool = False
+    reset_month: bool = False
+    update_stats: bool = True
+    update_roles: bool = False
+
+    completed_phases: list[RefreshPhase] = Field(default_factory=list)
+
+    # Checkpoints of the phase in progress. Users are refreshed and servers are
+    # notified in ascending id order, and every id up to and including the checkpoint
+    # has been processed.
+    last_user_id: int | None = None
+    last_server_id: int | None = None
+
+    finished_at: datetime | None = None
+
+    class Settings:
+        name = "refresh_jobs"
+        indexes = [
+            IndexModel([("finished_at", ASCENDING), ("started_at", ASCENDING)]),
+        ]
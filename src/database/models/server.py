@@ -1,5 +1,5 @@
 from datetime import UTC, datetime
-from typing import List
+from typing import Dict, List
 
 from beanie import Document
 from pydantic import BaseModel, Field
@@ -15,6 +15,9 @@ class Server(Document):
     id: int  # type: ignore
     timezone: str = "UTC"
     channels: Channels = Field(default_factory=Channels)
+    # {notification option: {channel_id: number of broadcasts in a row the channel
+    # failed to be delivered to}}
+    channel_failures: Dict[str, Dict[str, int]] = Field(default_factory=dict)
 
     last_update_start: datetime = Field(default_factory=lambda: datetime.now(UTC))
     last_update_end: datetime = Field(default_factory=lambda: datetime.now(UTC))
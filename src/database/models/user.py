@@ -3,6 +3,7 @@ from typing import List
 
 from beanie import Document
 from pydantic import BaseModel, Field
+from pymongo import ASCENDING, IndexModel
 
 
 class Votes(BaseModel):
@@ -38,6 +39,25 @@ class SkillsProblemCount(BaseModel):
     advanced: List[SkillProblemCount] = Field(default_factory=list)
 
 
+class Breakdown(BaseModel):
+    languages_problem_count: List[LanguageProblemCount] = Field(default_factory=list)
+    skills_problem_count: SkillsProblemCount = Field(default_factory=SkillsProblemCount)
+
+
+class PeriodScores(BaseModel):
+    # Start of the day the scores are valid for.
+    as_of: datetime
+    # Scores at the start of the current day, week and month, taken from the first
+    # record in each, or None if there is no record yet.
+    day_start: int | None = None
+    week_start: int | None = None
+    month_start: int | None = None
+    # Scores gained during the previous day, week and month.
+    previous_day: int = 0
+    previous_week: int = 0
+    previous_month: int = 0
+
+
 class User(Document):
     id: int  # type: ignore
     leetcode_id: str
@@ -45,7 +65,20 @@ class User(Document):
     votes: Votes = Field(default_factory=Votes)
 
     last_updated: datetime = Field(default_factory=lambda: datetime.now(UTC))
+    # When the user's score was last observed to change, used to decide how often their
+    # stats are refreshed.
+    score_last_changed: datetime | None = None
+    # Scores at the period boundaries, updated whenever the midnight record is written
+    # so that period scores don't need to be computed from the records.
+    period_scores: PeriodScores | None = None
+    # The full breakdown of the latest record, which the next record's breakdown is
+    # encoded against.
+    last_breakdown: Breakdown | None = None
 
     class Settings:
         name = "users"
         use_state_management = True
+        indexes = [
+            # Used to find the users whose stats refresh is due.
+            IndexModel([("score_last_changed", ASCENDING)]),
+        ]
@@ -1,26 +1,71 @@
+import logging
 import os
+from typing import Type
 
-from beanie import init_beanie
+from beanie import Document, init_beanie
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import OperationFailure
 
-from .models import Profile, Record, Server, User
+from src.constants import RECORD_COMPACTION_MIN_MONGODB_VERSION
+
+from .models import (
+    LeaderboardSnapshot,
+    LeaderboardSnapshotChunk,
+    Profile,
+    Record,
+    RecordRollup,
+    RefreshJob,
+    Server,
+    User,
+)
+
+DOCUMENT_MODELS: list[Type[Document]] = [
+    LeaderboardSnapshot,
+    LeaderboardSnapshotChunk,
+    Profile,
+    Record,
+    RecordRollup,
+    RefreshJob,
+    Server,
+    User,
+]
 
 
 async def initialise_mongodb_connection(
-    mongodb_uri: str, global_leaderboard_id: int = 0
+    mongodb_uri: str,
+    global_leaderboard_id: int = 0,
+    logger: logging.Logger | None = None,
 ) -> None:
     """
     Initialise the MongoDB connection and create the necessary collections
 
     :param mongodb_uri: The MongoDB URI
     :param global_leaderboard_id: The ID of the global leaderboard server document
+    :param logger: The logger that index failures and missing indexes are reported to
     """
+    logger = logger or logging.getLogger(__name__)
     mongodb_client = AsyncIOMotorClient(mongodb_uri)
 
+    # Indexes are created separately, so that an index that can't be built (such as a
+    # unique index over existing duplicates) doesn't prevent the bot from starting.
     await init_beanie(
         database=mongodb_client.bot,
-        document_models=[Profile, Record, Server, User],
+        document_models=DOCUMENT_MODELS,  # type: ignore
+        skip_indexes=True,
     )
+    await create_indexes(logger)
+
+    for collection, index_name in await missing_indexes():
+        logger.warning(
+            f"MongoDB index missing | Collection: {collection} | Index: {index_name}"
+        )
+
+    server_info = await mongodb_client.server_info()
+    if tuple(server_info["versionArray"][:2]) < RECORD_COMPACTION_MIN_MONGODB_VERSION:
+        logger.warning(
+            f"MongoDB version unsupported | Version: {server_info['version']} | "
+            "Records won't be compacted"
+        )
 
     server = await Server.get(global_leaderboard_id)
     if not server:
@@ -28,6 +73,46 @@ async def initialise_mongodb_connection(
         await server.create()
 
 
+async def create_indexes(logger: logging.Logger) -> None:
+    """
+    Create the indexes declared in the document models' settings, one at a time.
+
+    Beanie holds the declared indexes as `IndexModelField`s once initialised.
+
+    :param logger: The logger that index failures are reported to
+    """
+    for document_model in DOCUMENT_MODELS:
+        collection = document_model.get_motor_collection()
+
+        for index in document_model.get_settings().indexes or []:
+            try:
+                await collection.create_indexes([index.index])
+            except OperationFailure:
+                logger.exception(
+                    f"MongoDB index creation failed | "
+                    f"Collection: {collection.name} | Index: {index.name}"
+                )
+
+
+async def missing_indexes() -> list[tuple[str, str]]:
+    """
+    Find the indexes declared in the document models' settings that don't exist.
+
+    :return: The collection and name of each missing index
+    """
+    missing: list[tuple[str, str]] = []
+
+    for document_model in DOCUMENT_MODELS:
+        collection = document_model.get_motor_collection()
+        existing = await collection.index_information()
+
+        for index in document_model.get_settings().indexes or []:
+            if index.name not in existing:
+                missing.append((collection.name, index.name))
+
+    return missing
+
+
 if __name__ == "__main__":
     import asyncio
 
@@ -1,27 +1,41 @@
+from typing import Awaitable, Callable
+
 import discord
+from cachetools import LRUCache
 
 from src.ui.embeds.general import not_creator_embed
 
 
 class LeaderboardPagination(discord.ui.View):
+    """
+    Pages through a leaderboard, rendering each page when it's first shown rather than
+    every page up front.
+
+    :param user_id: The user allowed to change the page.
+    :param render_page: Renders the embed of a page from its index.
+    :param num_pages: The number of pages.
+    :param page: The index of the page initially shown.
+    :param cached_pages: The number of recently rendered pages to keep.
+    """
+
     def __init__(
         self,
         user_id: int | None,
-        pages: list[discord.Embed],
+        render_page: Callable[[int], Awaitable[discord.Embed]],
+        num_pages: int,
         page: int = 0,
         *,
+        cached_pages: int = 4,
         timeout=180
     ):
         super().__init__(timeout=timeout)
         self.page = page
         self.user_id = user_id
+        self.render_page = render_page
+        # {page index: embed}
+        self.pages: LRUCache[int, discord.Embed] = LRUCache(maxsize=cached_pages)
 
-        if pages is None:
-            self.pages = []
-        else:
-            self.pages = pages
-
-        self.max_page = len(self.pages) - 1
+        self.max_page = num_pages - 1
 
         if self.page == 0:
             self.previous.disabled, self.previous.style = True, discord.ButtonStyle.gray
@@ -31,6 +45,20 @@ class LeaderboardPagination(discord.ui.View):
             self.next.disabled, self.next.style = True, discord.ButtonStyle.gray
             self.end.disabled, self.end.style = True, discord.ButtonStyle.gray
 
+    async def get_page(self, page: int) -> discord.Embed:
+        """
+        Get the embed of a page, rendering it if it isn't one of the recently shown
+        pages.
+
+        :param page: The page index.
+
+        :return: The page's embed.
+        """
+        if page not in self.pages:
+            self.pages[page] = await self.render_page(page)
+
+        return self.pages[page]
+
     @discord.ui.button(label="<<", style=discord.ButtonStyle.blurple)
     async def start(
         self, interaction: discord.Interaction, button: discord.ui.Button
@@ -45,7 +73,7 @@ class LeaderboardPagination(discord.ui.View):
             return
 
         self.page = 0
-        await interaction.message.edit(embed=self.pages[self.page])
+        await interaction.message.edit(embed=await self.get_page(self.page))
 
         button.disabled, button.style = True, discord.ButtonStyle.gray
         self.previous.disabled, self.previous.style = True, discord.ButtonStyle.gray
@@ -69,7 +97,7 @@ class LeaderboardPagination(discord.ui.View):
 
         if self.page - 1 >= 0:
             self.page -= 1
-            await interaction.message.edit(embed=self.pages[self.page])
+            await interaction.message.edit(embed=await self.get_page(self.page))
 
             if self.page == 0:
                 button.disabled, button.style = True, discord.ButtonStyle.gray
@@ -95,7 +123,7 @@ class LeaderboardPagination(discord.ui.View):
 
         if self.page + 1 <= self.max_page:
             self.page += 1
-            await interaction.message.edit(embed=self.pages[self.page])
+            await interaction.message.edit(embed=await self.get_page(self.page))
 
             if self.page == self.max_page:
                 button.disabled, button.style = True, discord.ButtonStyle.gray
@@ -120,7 +148,7 @@ class LeaderboardPagination(discord.ui.View):
             return
 
         self.page = self.max_page
-        await interaction.message.edit(embed=self.pages[self.page])
+        await interaction.message.edit(embed=await self.get_page(self.page))
 
         button.disabled, button.style = True, discord.ButtonStyle.gray
         self.next.disabled, self.next.style = False, discord.ButtonStyle.gray
@@ -2,6 +2,7 @@ from typing import TYPE_CHECKING, cast
 
 import discord
 from beanie.odm.operators.update.array import AddToSet, Pull
+from beanie.odm.operators.update.general import Unset
 
 from src.constants import NotificationOptions
 from src.database.models import Server
@@ -157,6 +158,16 @@ class SaveButton(discord.ui.Button):
         """
 
         if adding:
+            # A channel that is set again starts without any delivery failures.
+            await Server.find_one(Server.id == server_id).update(
+                Unset(
+                    {
+                        f"channel_failures.{option.value}.{channel_id}": ""
+                        for option in selected_notification_options
+                    }
+                )
+            )
+
             for notification_option in selected_notification_options:
                 if notification_option == NotificationOptions.MAINTENANCE:
                     await Server.find_one(Server.id == server_id).update(
@@ -0,0 +1,171 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Iterable
+
+import backoff
+import discord
+from datadog.dogstatsd.base import statsd
+
+from src.utils.http_client import AdaptiveTokenBucket
+from src.utils.notification_targets import NotificationTargets
+
+if TYPE_CHECKING:
+    # To prevent circular imports
+    from src.bot import DiscordBot
+
+
+@dataclass
+class Delivery:
+    """
+    A notification to send to a channel.
+
+    `send` is called again for each retry, so it must create a new request each time.
+    """
+
+    channel_id: int
+    send: Callable[[], Awaitable[Any]]
+
+
+def is_transient(error: Exception) -> bool:
+    """
+    Whether a failed Discord request is worth retrying, i.e. it was rate limited or
+    failed on Discord's side.
+
+    :param error: The error raised by the request.
+    """
+    return isinstance(error, discord.errors.HTTPException) and (
+        error.status == 429 or error.status >= 500
+    )
+
+
+class Broadcaster:
+    """
+    Sends a notification to many channels concurrently.
+
+    Deliveries are paced by a token bucket, which keeps the bot below Discord's global
+    limit of 50 requests per second (a delivery can take more than one request, such as
+    a message and its thread), and at most `concurrency` are in flight at once.
+    Per-route limits are handled by discord.py, which waits for a route's bucket to
+    reset before sending. Rate limited and server errors are retried with exponential
+    backoff, and rate limits slow the bucket down.
+
+    :param bot: The Discord bot instance.
+    :param notification_type: The type of notification, used to tag the metrics.
+    :param targets: The registry the deliveries' channels were resolved from, which
+    is told whether each delivery succeeded.
+    :param concurrency: The maximum number of deliveries in flight.
+    """
+
+    # Deliveries per second.
+    INITIAL_RATE = 20.0
+    MIN_RATE = 2.0
+    MAX_RATE = 20.0
+    BURST_CAPACITY = 10.0
+
+    CONCURRENCY = 16
+    MAX_TRIES = 4
+
+    def __init__(
+        self,
+        bot: "DiscordBot",
+        notification_type: str,
+        targets: NotificationTargets | None = None,
+        concurrency: int = CONCURRENCY,
+    ) -> None:
+        self.bot = bot
+        self.notification_type = notification_type
+        self.targets = targets
+        self.bucket = AdaptiveTokenBucket(
+            rate=self.INITIAL_RATE,
+            min_rate=self.MIN_RATE,
+            max_rate=self.MAX_RATE,
+            capacity=self.BURST_CAPACITY,
+        )
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+        self.sent = 0
+        self.failed = 0
+
+    async def broadcast(self, deliveries: Iterable[Delivery]) -> None:
+        """
+        Send every delivery, waiting until all of them have been sent or have failed.
+
+        :param deliveries: The notifications to send.
+        """
+        start = time.perf_counter()
+        sent, failed = self.sent, self.failed
+
+        await asyncio.gather(*(self.deliver(delivery) for delivery in deliveries))
+
+        if self.targets:
+            await self.targets.flush()
+
+        tags = [f"type:{self.notification_type}"]
+        statsd.timing(
+            "discord.bot.broadcast.duration", time.perf_counter() - start, tags=tags
+        )
+        statsd.increment("discord.bot.broadcast.sent", self.sent - sent, tags=tags)
+        statsd.increment(
+            "discord.bot.broadcast.failed", self.failed - failed, tags=tags
+        )
+
+    async def deliver(self, delivery: Delivery) -> None:
+        """
+        Send a single delivery, logging it if it fails.
+
+        :param delivery: The notification to send.
+        """
+        async with self.semaphore:
+            try:
+                await self.send(delivery)
+                self.sent += 1
+                if self.targets:
+                    self.targets.record_success(delivery.channel_id)
+            except (discord.errors.Forbidden, discord.errors.NotFound):
+                self.failed += 1
+                if self.targets:
+                    self.targets.record_failure(delivery.channel_id)
+                self.bot.logger.warning(
+                    f"Notification failed | Channel unavailable | "
+                    f"Type: {self.notification_type} | "
+                    f"Channel ID: {delivery.channel_id}"
+                )
+            except Exception:
+                self.failed += 1
+                self.bot.logger.exception(
+                    f"Notification failed | Type: {self.notification_type} | "
+                    f"Channel ID: {delivery.channel_id}"
+                )
+
+    async def send(self, delivery: Delivery) -> None:
+        """
+        Send a delivery once a token is available, retrying transient errors.
+
+        :param delivery: The notification to send.
+        """
+
+        def on_backoff(details: dict) -> None:
+            # Only rate limits slow the broadcast down, server errors are just retried.
+            if details["exception"].status == 429:
+                self.bucket.on_rate_limited()
+
+            statsd.increment(
+                "discord.bot.broadcast.retries",
+                tags=[f"type:{self.notification_type}"],
+            )
+
+        @backoff.on_exception(
+            backoff.expo,
+            discord.errors.HTTPException,
+            max_tries=self.MAX_TRIES,
+            giveup=lambda error: not is_transient(error),
+            on_backoff=on_backoff,
+            logger=None,
+        )
+        async def send_with_retries() -> None:
+            await self.bucket.acquire()
+            await delivery.send()
+            self.bucket.on_success()
+
+        await send_with_retries()
@@ -0,0 +1,304 @@
+import bisect
+import difflib
+import random
+import re
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from src.constants import Difficulty, RequestPriority
+from src.utils.problems import HEADERS, URL
+
+if TYPE_CHECKING:
+    # To prevent circular imports
+    from src.bot import DiscordBot
+
+
+@dataclass
+class CatalogueProblem:
+    question_id: str
+    title: str
+    title_slug: str
+    difficulty: str
+    paid_only: bool
+    tags: list[str] = field(default_factory=list)
+
+
+def normalise_title(text: str) -> str:
+    """
+    Normalises a problem title or search text for matching.
+
+    :param text: The text to normalise.
+
+    :return: The lowercase text with punctuation and repeated whitespace collapsed into
+    single spaces.
+    """
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text.lower()).split())
+
+
+def first_with_prefix(sorted_titles: list[str], prefix: str) -> str | None:
+    """
+    Finds the alphabetically first title starting with a prefix, by binary search.
+
+    :param sorted_titles: The titles, sorted.
+    :param prefix: The prefix.
+
+    :return: The title, or None if no title starts with the prefix.
+    """
+    i = bisect.bisect_left(sorted_titles, prefix)
+    if i < len(sorted_titles) and sorted_titles[i].startswith(prefix):
+        return sorted_titles[i]
+
+    return None
+
+
+class ProblemCatalogue:
+    """
+    A periodically refreshed, in-memory index of every LeetCode problem, used to answer
+    problem searches and random picks without a network round trip.
+    """
+
+    # Number of problems requested per page when refreshing the catalogue.
+    PAGE_SIZE = 1000
+    # Minimum similarity (0 to 1) for a fuzzy title match. Less similar titles are
+    # left to LeetCode's search, rather than risking the wrong problem.
+    FUZZY_CUTOFF = 0.8
+    # Length of the word prefixes that fuzzy matches are found by. Shorter words are
+    # too common to narrow the candidates down.
+    WORD_PREFIX_LENGTH = 3
+
+    def __init__(self, bot: "DiscordBot") -> None:
+        self.bot = bot
+        # {title_slug: CatalogueProblem}
+        self.problems: dict[str, CatalogueProblem] = {}
+        # {frontend question id: title_slug}
+        self.id_to_slug: dict[str, str] = {}
+        # {normalised title: title_slug}
+        self.title_to_slug: dict[str, str] = {}
+        # Normalised titles, sorted for prefix lookups.
+        self.sorted_titles: list[str] = []
+        # {normalised title without spaces: title_slug}, to match text that splits or
+        # joins the words of a title differently, such as "3 sum" for "3Sum".
+        self.compact_title_to_slug: dict[str, str] = {}
+        # Normalised titles without spaces, sorted for prefix lookups.
+        self.sorted_compact_titles: list[str] = []
+        # {word prefix: {normalised title}} of the words in each title.
+        self.titles_by_word_prefix: dict[str, set[str]] = {}
+        # {difficulty: [title_slug,]} of problems that aren't premium.
+        self.free_by_difficulty: dict[str, list[str]] = {}
+
+    async def update_catalogue(self) -> None:
+        """
+        Fetches every problem and rebuilds the index.
+        """
+        problems = await self._fetch_problems()
+        if not problems:
+            return
+
+        self._build_index(problems)
+        self.bot.logger.info(
+            f"Problem catalogue updated | Problems: {len(self.problems)}"
+        )
+
+    def search(self, text: str) -> str | None:
+        """
+        Searches the catalogue for a problem by URL, frontend id, title slug or title.
+
+        Exact matches are tried first, followed by the alphabetically first title
+        starting with the text, both with and without spaces, and finally the most
+        similar title out of those that share the start of a word with the text.
+
+        :param text: The problem URL, id, slug or (partial) title.
+
+        :return: The title slug of the matched problem, or None if the catalogue is
+        empty or nothing matches.
+        """
+        if not self.problems:
+            return
+
+        text = text.strip()
+
+        if url_match := re.search(r"leetcode\.com/problems/([\w-]+)", text):
+            return url_match.group(1) if url_match.group(1) in self.problems else None
+
+        if text.rstrip(".") in self.id_to_slug:
+            return self.id_to_slug[text.rstrip(".")]
+
+        if text.lower() in self.problems:
+            return text.lower()
+
+        title = normalise_title(text)
+        if not title:
+            return
+
+        if title in self.title_to_slug:
+            return self.title_to_slug[title]
+
+        if prefix_match := first_with_prefix(self.sorted_titles, title):
+            return self.title_to_slug[prefix_match]
+
+        compact_title = title.replace(" ", "")
+        if compact_title in self.compact_title_to_slug:
+            return self.compact_title_to_slug[compact_title]
+
+        if prefix_match := first_with_prefix(self.sorted_compact_titles, compact_title):
+            return self.compact_title_to_slug[prefix_match]
+
+        candidates = set().union(
+            *(
+                self.titles_by_word_prefix.get(word[: self.WORD_PREFIX_LENGTH], ())
+                for word in title.split()
+            )
+        )
+        if close_matches := difflib.get_close_matches(
+            title, candidates, n=1, cutoff=self.FUZZY_CUTOFF
+        ):
+            return self.title_to_slug[close_matches[0]]
+
+    def random_question(self, difficulty: Difficulty) -> str | None:
+        """
+        Picks a random problem that isn't premium.
+
+        :param difficulty: The difficulty of the problem.
+
+        :return: The title slug of the picked problem, or None if the catalogue is
+        empty.
+        """
+        if difficulty == Difficulty.RANDOM:
+            candidates = [
+                title_slug
+                for title_slugs in self.free_by_difficulty.values()
+                for title_slug in title_slugs
+            ]
+        else:
+            candidates = self.free_by_difficulty.get(difficulty.name.capitalize(), [])
+
+        if not candidates:
+            return
+
+        return random.choice(candidates)
+
+    async def _fetch_problems(self) -> list[CatalogueProblem]:
+        """
+        Fetches every problem, one page at a time.
+
+        :return: The problems, or an empty list if any page fails to be fetched.
+        """
+        problems: list[CatalogueProblem] = []
+        total: int | None = None
+
+        while total is None or len(problems) < total:
+            payload = {
+                "operationName": "problemsetQuestionList",
+                "query": """
+                query problemsetQuestionList(
+                    $categorySlug: String,
+                    $limit: Int,
+                    $skip: Int,
+                    $filters: QuestionListFilterInput
+                ) {
+                    problemsetQuestionList: questionList(
+                        categorySlug: $categorySlug,
+                        limit: $limit,
+                        skip: $skip,
+                        filters: $filters
+                    ) {
+                        total: totalNum
+                        questions: data {
+                            questionFrontendId
+                            title
+                            titleSlug
+                            difficulty
+                            isPaidOnly
+                            topicTags {
+                                name
+                            }
+                        }
+                    }
+                }
+                """,
+                "variables": {
+                    "categorySlug": "",
+                    "skip": len(problems),
+                    "limit": self.PAGE_SIZE,
+                    "filters": {},
+                },
+            }
+
+            response_data = await self.bot.http_client.post_data(
+                URL,
+                json=payload,
+                headers=HEADERS,
+                timeout=30,
+                priority=RequestPriority.BACKGROUND,
+            )
+            if not response_data:
+                return []
+
+            try:
+                question_list = response_data["data"]["problemsetQuestionList"]
+                total = question_list["total"]
+                questions = question_list["questions"]
+
+                problems.extend(
+                    CatalogueProblem(
+                        question_id=question["questionFrontendId"],
+                        title=question["title"],
+                        title_slug=question["titleSlug"],
+                        difficulty=question["difficulty"],
+                        paid_only=question["isPaidOnly"],
+                        tags=[tag["name"] for tag in question["topicTags"]],
+                    )
+                    for question in questions
+                )
+
+            except (KeyError, ValueError, TypeError):
+                self.bot.logger.exception(
+                    f"Problem catalogue JSON decode failed | Response: {response_data}"
+                )
+                return []
+
+            # Guard against an inaccurate total causing an infinite loop.
+            if not questions:
+                break
+
+        return problems
+
+    def _build_index(self, problems: list[CatalogueProblem]) -> None:
+        """
+        Builds the lookup indexes, replacing the previous ones.
+
+        :param problems: Every problem.
+        """
+        title_to_slug: dict[str, str] = {}
+        titles_by_word_prefix: dict[str, set[str]] = {}
+        free_by_difficulty: dict[str, list[str]] = {}
+
+        for problem in problems:
+            title = normalise_title(problem.title)
+            title_to_slug.setdefault(title, problem.title_slug)
+
+            for word in title.split():
+                if len(word) >= self.WORD_PREFIX_LENGTH:
+                    titles_by_word_prefix.setdefault(
+                        word[: self.WORD_PREFIX_LENGTH], set()
+                    ).add(title)
+
+            if not problem.paid_only:
+                free_by_difficulty.setdefault(problem.difficulty, []).append(
+                    problem.title_slug
+                )
+
+        self.problems = {problem.title_slug: problem for problem in problems}
+        self.id_to_slug = {
+            problem.question_id: problem.title_slug for problem in problems
+        }
+        self.title_to_slug = title_to_slug
+        self.sorted_titles = sorted(title_to_slug)
+        self.compact_title_to_slug = {}
+        for title in self.sorted_titles:
+            self.compact_title_to_slug.setdefault(
+                title.replace(" ", ""), title_to_slug[title]
+            )
+        self.sorted_compact_titles = sorted(self.compact_title_to_slug)
+        self.titles_by_word_prefix = titles_by_word_prefix
+        self.free_by_difficulty = free_by_difficulty
@@ -1,13 +1,17 @@
 import asyncio
 from datetime import UTC, datetime
+from functools import partial
 from random import random
 from typing import TYPE_CHECKING
 
 import discord
 from datadog.dogstatsd.base import statsd
 
-from src.constants import GLOBAL_LEADERBOARD_ID
+from src.constants import GLOBAL_LEADERBOARD_ID, NotificationOptions
 from src.database.models import Profile, Server, User
+from src.utils.broadcasts import Broadcaster, Delivery
+from src.utils.leaderboard_snapshots import invalidate_leaderboard_snapshots
+from src.utils.notification_targets import NotificationTargets
 from src.utils.notifications import process_daily_question_and_stats_update
 from src.utils.users import delete_user
 
@@ -151,22 +155,18 @@ async def share_announcement(bot: "DiscordBot", message: discord.Message) -> Non
     if len(message.attachments) == 1:
         image_url = message.attachments[0].url
 
+    content = announcement + f"\n{image_url}" if image_url else announcement
+
+    targets = NotificationTargets(bot, NotificationOptions.MAINTENANCE)
+
+    deliveries = []
     async for db_server in Server.all():
-        for channel_id in db_server.channels.maintenance:
-            channel = bot.get_channel(channel_id)
-            if channel and isinstance(channel, discord.TextChannel):
-                try:
-                    if image_url:
-                        await channel.send(
-                            content=announcement + f"\n{image_url}",
-                        )
-                    else:
-                        await channel.send(content=announcement)
-
-                except discord.errors.Forbidden:
-                    bot.logger.warning(
-                        f"Cannot share announcement | Channel ID: {channel_id}"
-                    )
+        for channel in targets.resolve(db_server):
+            deliveries.append(
+                Delivery(channel.id, partial(channel.send, content=content))
+            )
+
+    await Broadcaster(bot, "announcement", targets).broadcast(deliveries)
 
 
 async def prune_members_and_guilds(bot: "DiscordBot") -> None:
@@ -186,6 +186,7 @@ async def prune_members_and_guilds(bot: "DiscordBot") -> None:
         except discord.errors.NotFound:
             await db_server.delete()
             await db_profiles.delete()
+            await invalidate_leaderboard_snapshots(db_server.id)
 
             bot.logger.info(f"Server deleted | ID: {db_server.id}")
             statsd.increment("db.servers.deleted", tags=["source:pruning"])
@@ -207,6 +208,7 @@ async def prune_members_and_guilds(bot: "DiscordBot") -> None:
                     f"Server ID: {db_server.id}"
                 )
                 statsd.increment("db.profiles.deleted", tags=["source:pruning"])
+                await invalidate_leaderboard_snapshots(db_server.id)
 
     # Delete users that no longer have any profiles.
     async for db_user in User.all():
@@ -1,37 +1,302 @@
 import asyncio
-from random import random
+import json
+from collections import deque
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
 from typing import TYPE_CHECKING
 
 import aiohttp
 import backoff
+from datadog.dogstatsd.base import statsd
+from yarl import URL
+
+from src.constants import RequestPriority
 
 if TYPE_CHECKING:
     # To prevent circular imports
     from src.bot import DiscordBot
 
-http_post_semaphore = asyncio.Semaphore(4)
-
 
 class RateLimitExceededException(Exception):
     def __init__(self) -> None:
         super().__init__("RateLimitExceededException. Error: 429. Rate Limited.")
 
 
+class AdaptiveTokenBucket:
+    """
+    A token bucket whose refill rate adapts using AIMD (additive increase,
+    multiplicative decrease).
+
+    Every successful request increases the rate by `increase`, whilst every rate limited
+    request multiplies it by `decrease_factor`, keeping the request rate just below
+    the point at which the upstream server starts rejecting requests.
+
+    :param rate: The initial number of tokens added per second.
+    :param min_rate: The lowest rate the bucket can shrink to.
+    :param max_rate: The highest rate the bucket can grow to.
+    :param capacity: The maximum number of tokens that can be accumulated (burst size).
+    :param increase: The rate added after each successful request.
+    :param decrease_factor: The factor the rate is multiplied by when rate limited.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        min_rate: float,
+        max_rate: float,
+        capacity: float,
+        increase: float = 0.1,
+        decrease_factor: float = 0.5,
+    ) -> None:
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.capacity = capacity
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+
+        self.tokens = capacity
+        self._updated_at = asyncio.get_running_loop().time()
+        self._blocked_until = 0.0
+        # asyncio.Lock wakes waiters in FIFO order, so requests are served fairly.
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """
+        Waits until a token is available and consumes it.
+        """
+        loop = asyncio.get_running_loop()
+
+        async with self._lock:
+            while True:
+                now = loop.time()
+                if now < self._blocked_until:
+                    await asyncio.sleep(self._blocked_until - now)
+                    continue
+
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def on_success(self) -> None:
+        """
+        Additively increases the rate after a successful request.
+        """
+        self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_rate_limited(self, retry_after: float | None = None) -> None:
+        """
+        Multiplicatively decreases the rate after a rate limited request.
+
+        :param retry_after: The number of seconds to wait before the next request, as
+        requested by the server.
+        """
+        self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+        self.tokens = 0
+        self._updated_at = asyncio.get_running_loop().time()
+
+        if retry_after:
+            self.block_for(retry_after)
+
+    def block_for(self, seconds: float) -> None:
+        """
+        Prevents any tokens from being handed out for the given number of seconds.
+
+        :param seconds: The number of seconds to block for.
+        """
+        loop = asyncio.get_running_loop()
+        self._blocked_until = max(self._blocked_until, loop.time() + seconds)
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self._updated_at) * self.rate
+        )
+        self._updated_at = now
+
+
+class HostRateLimiter:
+    """
+    Rate limits requests to a single host, serving requests in priority lanes.
+
+    All requests to the host share a single adaptive budget, as the upstream limit
+    applies to the host as a whole. Whenever a token becomes available it is handed to
+    the oldest interactive request, so background refreshes only ever use the capacity
+    that interactive commands leave over.
+
+    :param host: The host being rate limited.
+    """
+
+    # Requests per second.
+    INITIAL_RATE = 4.0
+    MIN_RATE = 0.5
+    MAX_RATE = 12.0
+    BURST_CAPACITY = 4.0
+
+    # Lanes in the order they are served.
+    LANES = (RequestPriority.INTERACTIVE, RequestPriority.BACKGROUND)
+
+    def __init__(self, host: str) -> None:
+        self.host = host
+        self.bucket = AdaptiveTokenBucket(
+            rate=self.INITIAL_RATE,
+            min_rate=self.MIN_RATE,
+            max_rate=self.MAX_RATE,
+            capacity=self.BURST_CAPACITY,
+        )
+        self.lanes: dict[RequestPriority, deque[asyncio.Future[None]]] = {
+            priority: deque() for priority in self.LANES
+        }
+        self._dispatcher: asyncio.Task | None = None
+
+    async def acquire(self, priority: RequestPriority) -> None:
+        """
+        Waits until a request of the given priority is allowed to be sent.
+
+        :param priority: The priority of the request.
+        """
+        loop = asyncio.get_running_loop()
+        enqueued_at = loop.time()
+
+        waiter: asyncio.Future[None] = loop.create_future()
+        self.lanes[priority].append(waiter)
+
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+        # If the caller is cancelled, the waiter is cancelled too and skipped by the
+        # dispatcher.
+        await waiter
+
+        statsd.histogram(
+            "http.ratelimit.queue_wait",
+            loop.time() - enqueued_at,
+            tags=[f"host:{self.host}", f"priority:{priority.value}"],
+        )
+
+    async def _dispatch(self) -> None:
+        """
+        Hands out tokens to the waiting requests, highest priority lane first, until
+        every lane is empty.
+        """
+        while any(self.lanes.values()):
+            await self.bucket.acquire()
+            self.report()
+
+            for priority in self.LANES:
+                lane = self.lanes[priority]
+
+                while lane and lane[0].done():
+                    lane.popleft()
+
+                if lane:
+                    lane.popleft().set_result(None)
+                    break
+            else:
+                # Every remaining waiter was cancelled whilst waiting for the token.
+                self.bucket.tokens += 1
+
+    def on_success(self) -> None:
+        self.bucket.on_success()
+
+    def on_rate_limited(self, retry_after: float | None) -> None:
+        """
+        Shrinks the host's budget and honours the server's `Retry-After`.
+
+        :param retry_after: The number of seconds the server asked to wait.
+        """
+        self.bucket.on_rate_limited(retry_after)
+        self.report()
+
+    def report(self) -> None:
+        """
+        Reports the current rate and the queue depth of each lane to Datadog.
+        """
+        statsd.gauge(
+            "http.ratelimit.rate", self.bucket.rate, tags=[f"host:{self.host}"]
+        )
+
+        for priority, lane in self.lanes.items():
+            statsd.gauge(
+                "http.ratelimit.queue_depth",
+                len(lane),
+                tags=[f"host:{self.host}", f"priority:{priority.value}"],
+            )
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """
+    Parses a `Retry-After` header, which is either a number of seconds or an HTTP date.
+
+    :param value: The header value.
+
+    :return: The number of seconds to wait, or None if the header is missing or
+    invalid.
+    """
+    if not value:
+        return
+
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return
+
+    return max((retry_at - datetime.now(UTC)).total_seconds(), 0.0)
+
+
 class HttpClient:
     def __init__(self, bot: "DiscordBot", session: aiohttp.ClientSession) -> None:
         self.bot = bot
         self.session = session
+        # {host: HostRateLimiter}
+        self.rate_limiters: dict[str, HostRateLimiter] = {}
+        # {request key: in-flight POST request}
+        self.in_flight: dict[str, asyncio.Task[dict | None]] = {}
+        self.coalesced_count = 0
 
-    async def fetch_data(self, *args, **kwargs) -> str | None:
+    def rate_limiter(self, url: str | URL) -> HostRateLimiter:
+        """
+        Returns the rate limiter of the URL's host, creating it if necessary.
+
+        :param url: The URL being requested.
+        """
+        host = URL(str(url)).host or ""
+        if host not in self.rate_limiters:
+            self.rate_limiters[host] = HostRateLimiter(host)
+
+        return self.rate_limiters[host]
+
+    async def fetch_data(
+        self,
+        url: str,
+        *args,
+        priority: RequestPriority = RequestPriority.INTERACTIVE,
+        **kwargs,
+    ) -> str | None:
         """
         Executes a GET request and handles any client errors.
 
+        :param url: The URL to send the request to.
+        :param priority: The priority of the request, which selects the lane it is
+        queued in.
+
         :return: The response text if the request is successful, otherwise None.
         """
+        rate_limiter = self.rate_limiter(url)
+        await rate_limiter.acquire(priority)
+
         try:
-            async with self.session.get(*args, **kwargs) as response:
+            async with self.session.get(url, *args, **kwargs) as response:
                 match response.status:
                     case 200:
+                        rate_limiter.on_success()
                         return await response.text()
                     case _:
                         self.bot.logger.error(
@@ -45,42 +310,119 @@ class HttpClient:
                 "ClientError or TimeoutError occurred while fetching data"
             )
 
-    @backoff.on_exception(backoff.expo, RateLimitExceededException, logger=None)
-    async def post_data(self, *args, **kwargs) -> dict | None:
+    async def post_data(
+        self,
+        url: str,
+        *args,
+        priority: RequestPriority = RequestPriority.INTERACTIVE,
+        coalesce: bool = False,
+        **kwargs,
+    ) -> dict | None:
         """
         Executes a POST request with rate limit handling and error logging.
 
+        With `coalesce`, concurrent identical requests (same URL, operation and
+        variables) share a single in-flight request and all receive its response, which
+        must therefore be treated as read-only.
+
+        :param url: The URL to send the request to.
+        :param priority: The priority of the request, which selects the lane it is
+        queued in.
+        :param coalesce: Whether to share the response with identical in-flight
+        requests.
+
+        :return: The response JSON if the request is successful, otherwise None.
+        """
+        if not coalesce:
+            return await self._post_data(url, *args, priority=priority, **kwargs)
+
+        payload = kwargs.get("json") or {}
+        key = "|".join(
+            (
+                url,
+                str(payload.get("operationName")),
+                json.dumps(payload.get("variables"), sort_keys=True),
+            )
+        )
+
+        if task := self.in_flight.get(key):
+            self.coalesced_count += 1
+            statsd.increment(
+                "http.requests.coalesced",
+                tags=[f"operation:{payload.get('operationName')}"],
+            )
+        else:
+            task = asyncio.create_task(
+                self._post_data(url, *args, priority=priority, **kwargs)
+            )
+            self.in_flight[key] = task
+            task.add_done_callback(lambda task: self._request_done(key, task))
+
+        # Shield the shared request so that a cancelled caller doesn't cancel it for
+        # the other callers waiting on it.
+        return await asyncio.shield(task)
+
+    def _request_done(self, key: str, task: asyncio.Task) -> None:
+        """
+        Removes a finished coalesced request from the in-flight requests.
+
+        :param key: The key of the request.
+        :param task: The finished request.
+        """
+        if self.in_flight.get(key) is task:
+            del self.in_flight[key]
+
+        # Retrieve the exception so it isn't reported as never retrieved if every
+        # caller was cancelled.
+        if not task.cancelled():
+            task.exception()
+
+    @backoff.on_exception(backoff.expo, RateLimitExceededException, logger=None)
+    async def _post_data(
+        self,
+        url: str,
+        *args,
+        priority: RequestPriority = RequestPriority.INTERACTIVE,
+        **kwargs,
+    ) -> dict | None:
+        """
+        Executes a POST request, retrying with exponential backoff whilst rate limited.
+
+        :param url: The URL to send the request to.
+        :param priority: The priority of the request, which selects the lane it is
+        queued in.
+
         :return: The response JSON if the request is successful, otherwise None.
         """
-        async with http_post_semaphore:
-            try:
-                async with self.session.post(*args, **kwargs) as response:
-                    match response.status:
-                        case 200:
-                            # Add a small delay to avoid rate limits, using random to
-                            # avoid patterns.
-                            # TODO: Look into whether this is necessary:
-                            # increases overall execution time but decreases the
-                            # number of rate limited requests.
-                            await asyncio.sleep(random())
-                            return await response.json()
-                        case 429:
-                            self.bot.channel_logger.rate_limited()
-                            raise RateLimitExceededException()
-                        case 403:
-                            self.bot.logger.error(
-                                f"POST request forbidden | "
-                                f"Status code: {response.status} | "
-                                f"URL: {response.url}"
-                            )
-                            self.bot.channel_logger.forbidden()
-                        case _:
-                            self.bot.logger.error(
-                                f"POST request failed | "
-                                f"Status code: {response.status} | URL: {response.url}"
-                            )
-
-            except (aiohttp.ClientError, asyncio.TimeoutError):
-                self.bot.logger.exception(
-                    "Failed to POST data | ClientError or TimeoutError occurred"
-                )
+        rate_limiter = self.rate_limiter(url)
+        await rate_limiter.acquire(priority)
+
+        try:
+            async with self.session.post(url, *args, **kwargs) as response:
+                match response.status:
+                    case 200:
+                        rate_limiter.on_success()
+                        return await response.json()
+                    case 429:
+                        rate_limiter.on_rate_limited(
+                            parse_retry_after(response.headers.get("Retry-After"))
+                        )
+                        self.bot.channel_logger.rate_limited()
+                        raise RateLimitExceededException()
+                    case 403:
+                        self.bot.logger.error(
+                            f"POST request forbidden | "
+                            f"Status code: {response.status} | "
+                            f"URL: {response.url}"
+                        )
+                        self.bot.channel_logger.forbidden()
+                    case _:
+                        self.bot.logger.error(
+                            f"POST request failed | "
+                            f"Status code: {response.status} | URL: {response.url}"
+                        )
+
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            self.bot.logger.exception(
+                "Failed to POST data | ClientError or TimeoutError occurred"
+            )
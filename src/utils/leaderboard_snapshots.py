@@ -0,0 +1,212 @@
+import uuid
+from array import array
+from datetime import datetime
+
+from beanie.odm.operators.update.general import Set
+from beanie.operators import In
+from datadog.dogstatsd.base import statsd
+
+from src.constants import LeaderboardSortBy, Period
+from src.database.models import LeaderboardSnapshot, LeaderboardSnapshotChunk, Profile
+from src.utils.rankings import BUFFERS, INT64, LeaderboardRanking
+
+# Number of ranked users per snapshot chunk. Each user takes 48 bytes, so a chunk is
+# under 5MB, well below MongoDB's 16MB document limit.
+SNAPSHOT_CHUNK_SIZE = 100_000
+
+
+async def find_leaderboard_snapshot(
+    server_id: int,
+    period: Period,
+    previous: bool,
+    sort_by: LeaderboardSortBy,
+    period_start: datetime | None,
+) -> LeaderboardRanking | None:
+    """
+    Find the stored leaderboard ranking of a server, joining its chunks.
+
+    :param server_id: The server's id.
+    :param period: The period of the leaderboard.
+    :param previous: Whether the leaderboard is of one period before.
+    :param sort_by: Sorting method.
+    :param period_start: The start of the current period, or None for all-time.
+
+    :return: The ranking, or None if there isn't a complete one computed in the current
+    period.
+    """
+    db_snapshot = await LeaderboardSnapshot.find_one(
+        LeaderboardSnapshot.server_id == server_id,
+        LeaderboardSnapshot.period == period,
+        LeaderboardSnapshot.previous == previous,
+        LeaderboardSnapshot.sort_by == sort_by,
+        LeaderboardSnapshot.period_start == period_start,
+    )
+
+    db_chunks: list[LeaderboardSnapshotChunk] = []
+    if db_snapshot and db_snapshot.generation:
+        db_chunks = (
+            await LeaderboardSnapshotChunk.find_many(
+                LeaderboardSnapshotChunk.generation == db_snapshot.generation
+            )
+            .sort(+LeaderboardSnapshotChunk.index)  # type: ignore
+            .to_list()
+        )
+
+    # Chunks can be missing if a newer ranking replaced them whilst they were read.
+    found = bool(
+        db_snapshot and db_snapshot.generation and len(db_chunks) == db_snapshot.chunks
+    )
+
+    statsd.increment(
+        "leaderboards.snapshots.hits" if found else "leaderboards.snapshots.misses",
+        tags=[f"period:{period.value}"],
+    )
+
+    if not found:
+        return None
+
+    return LeaderboardRanking.from_bytes(
+        sort_by,
+        {
+            name: b"".join(getattr(db_chunk, name) for db_chunk in db_chunks)
+            for name in BUFFERS
+        },
+    )
+
+
+async def save_leaderboard_snapshot(
+    server_id: int,
+    period: Period,
+    previous: bool,
+    sort_by: LeaderboardSortBy,
+    period_start: datetime | None,
+    ranking: LeaderboardRanking,
+) -> None:
+    """
+    Store the leaderboard ranking of a server in chunks, replacing the previous
+    snapshot.
+
+    The chunks are written under a new generation before the snapshot is pointed at
+    them, so readers never see a mix of the old and new rankings, and the old chunks
+    are deleted afterwards.
+
+    :param server_id: The server's id.
+    :param period: The period of the leaderboard.
+    :param previous: Whether the leaderboard is of one period before.
+    :param sort_by: Sorting method.
+    :param period_start: The start of the current period, or None for all-time.
+    :param ranking: The leaderboard ranking.
+    """
+    buffers = ranking.to_bytes()
+    chunk_bytes = SNAPSHOT_CHUNK_SIZE * array(INT64).itemsize
+    generation = uuid.uuid4().hex
+
+    db_chunks = [
+        LeaderboardSnapshotChunk(
+            server_id=server_id,
+            period=period,
+            previous=previous,
+            sort_by=sort_by,
+            generation=generation,
+            index=index,
+            **{
+                name: buffer[start : start + chunk_bytes]
+                for name, buffer in buffers.items()
+            },
+        )
+        for index, start in enumerate(range(0, len(buffers["user_ids"]), chunk_bytes))
+    ]
+    if db_chunks:
+        await LeaderboardSnapshotChunk.insert_many(db_chunks)
+
+    db_snapshot = LeaderboardSnapshot(
+        server_id=server_id,
+        period=period,
+        previous=previous,
+        sort_by=sort_by,
+        period_start=period_start,
+        generation=generation,
+        chunks=len(db_chunks),
+    )
+
+    await LeaderboardSnapshot.find_one(
+        LeaderboardSnapshot.server_id == server_id,
+        LeaderboardSnapshot.period == period,
+        LeaderboardSnapshot.previous == previous,
+        LeaderboardSnapshot.sort_by == sort_by,
+    ).upsert(
+        Set(
+            {
+                LeaderboardSnapshot.period_start: period_start,
+                LeaderboardSnapshot.generation: generation,
+                LeaderboardSnapshot.chunks: len(db_chunks),
+                LeaderboardSnapshot.generated_at: db_snapshot.generated_at,
+            }
+        ),
+        on_insert=db_snapshot,
+    )  # type: ignore
+
+    await LeaderboardSnapshotChunk.find_many(
+        LeaderboardSnapshotChunk.server_id == server_id,
+        LeaderboardSnapshotChunk.period == period,
+        LeaderboardSnapshotChunk.previous == previous,
+        LeaderboardSnapshotChunk.sort_by == sort_by,
+        LeaderboardSnapshotChunk.generation != generation,
+    ).delete()
+
+
+async def invalidate_leaderboard_snapshots(*server_ids: int) -> None:
+    """
+    Delete the stored leaderboards of servers, so that they are recomputed when next
+    viewed.
+
+    Should be called whenever the members of a server change outside of a stats
+    refresh, such as when a member is added or removed. Names and preferences aren't
+    stored in the snapshots, as they are fetched for each rendered page, so changing
+    them doesn't invalidate anything.
+
+    :param server_ids: The servers' ids.
+    """
+    if not server_ids:
+        return
+
+    await LeaderboardSnapshot.find_many(
+        In(LeaderboardSnapshot.server_id, list(server_ids))
+    ).delete()
+    await LeaderboardSnapshotChunk.find_many(
+        In(LeaderboardSnapshotChunk.server_id, list(server_ids))
+    ).delete()
+
+
+async def invalidate_period_leaderboard_snapshots(*periods: Period) -> None:
+    """
+    Delete the stored leaderboards of periods on every server, so that they are
+    recomputed when next viewed.
+
+    Must be called once a refresh job has reset the periods. Leaderboards viewed after
+    a period started but before its reset finished were computed from incomplete
+    period scores and win counts, yet would be kept for the whole period.
+
+    :param periods: The reset periods.
+    """
+    if not periods:
+        return
+
+    await LeaderboardSnapshot.find_many(
+        In(LeaderboardSnapshot.period, list(periods))
+    ).delete()
+    await LeaderboardSnapshotChunk.find_many(
+        In(LeaderboardSnapshotChunk.period, list(periods))
+    ).delete()
+
+
+async def invalidate_user_leaderboard_snapshots(user_id: int) -> None:
+    """
+    Delete the stored leaderboards of every server a user has a profile in.
+
+    Must be called before the user's profiles are deleted.
+
+    :param user_id: The user's id.
+    """
+    server_ids = await Profile.distinct("server_id", {"user_id": user_id})
+    await invalidate_leaderboard_snapshots(*server_ids)
@@ -1,185 +1,460 @@
 import asyncio
 import math
+from array import array
+from dataclasses import dataclass
 from datetime import UTC, datetime, timedelta
-from typing import TYPE_CHECKING
+from typing import Awaitable, Callable
 
 import discord
 from beanie.operators import In
 from datadog.dogstatsd.base import statsd
 
 from src.constants import GLOBAL_LEADERBOARD_ID, LeaderboardSortBy, Period, RankEmoji
-from src.database.models import Profile, Record, Server, User
+from src.database.models import (
+    LeaderboardSnapshot,
+    PeriodScores,
+    Profile,
+    Record,
+    Server,
+    User,
+)
 from src.ui.embeds.leaderboards import empty_leaderboard_embed, leaderboard_embed
 from src.ui.views.leaderboards import LeaderboardPagination
-
-if TYPE_CHECKING:
-    # To prevent circular imports
-    from src.bot import DiscordBot
-
-
-async def user_score(db_user: User, period: Period, previous: bool) -> int:
+from src.utils.broadcasts import Delivery
+from src.utils.leaderboard_snapshots import (
+    find_leaderboard_snapshot,
+    save_leaderboard_snapshot,
+)
+from src.utils.rankings import INT64, LeaderboardRanking
+from src.utils.records import as_utc, record_scores
+
+# Maximum number of snapshots recomputed concurrently after a stats refresh.
+SNAPSHOT_REBUILD_CONCURRENCY = 8
+
+# {period: (start score field, previous score field)} of `PeriodScores`.
+PERIOD_SCORE_FIELDS = {
+    Period.DAY: ("day_start", "previous_day"),
+    Period.WEEK: ("week_start", "previous_week"),
+    Period.MONTH: ("month_start", "previous_month"),
+}
+
+# {period: `WinCount` field} of the periods that win counts are tracked for.
+WIN_COUNT_FIELDS = {
+    Period.DAY: "days",
+    Period.WEEK: "weeks",
+    Period.MONTH: "months",
+}
+
+
+@dataclass
+class LeaderboardProfile:
+    leetcode_id: str
+    name: str
+    url: bool
+    anonymous: bool
+
+
+def period_boundaries(
+    period: Period, now: datetime | None = None
+) -> tuple[datetime, datetime] | None:
     """
-    Get the score for a given period for a user.
+    Get the boundaries of the previous and current period.
 
-    :param db_user: The user to retrieve the score for.
-    :param period: The period for which to retrieve the score.
-    :param previous: Whether to get the score for the previous period.
+    :param period: The period.
+    :param now: The time to get the boundaries at, defaults to the current time.
 
-    :return: The calculated score for the specified period.
+    :return: The start of the previous period and the start of the current period (the
+    end of the previous one), or None for all-time.
     """
-
-    if period == Period.ALLTIME:
-        return db_user.stats.submissions.score
-
     record_timestamp_end: datetime | None = None
     record_timestamp_start: datetime | None = None
 
+    now = now or datetime.now(UTC)
+
     # Determine the start and end timestamps based on the specified period
     match period:
         case Period.DAY:
             # Midnight today
-            record_timestamp_end = datetime.now(UTC).replace(
+            record_timestamp_end = now.replace(
                 hour=0, minute=0, second=0, microsecond=0
             )
             record_timestamp_start = record_timestamp_end - timedelta(days=1)
 
         case Period.WEEK:
             # Midnight of the current week's start (Monday)
-            record_timestamp_end = datetime.now(UTC).replace(
+            record_timestamp_end = now.replace(
                 hour=0, minute=0, second=0, microsecond=0
-            ) - timedelta(days=datetime.now(UTC).weekday())
+            ) - timedelta(days=now.weekday())
             record_timestamp_start = record_timestamp_end - timedelta(weeks=1)
 
         case Period.MONTH:
             # Midnight of the first day of the current month
-            record_timestamp_end = datetime.now(UTC).replace(
+            record_timestamp_end = now.replace(
                 day=1, hour=0, minute=0, second=0, microsecond=0
             )
             record_timestamp_start = (record_timestamp_end - timedelta(days=1)).replace(
                 day=1
             )
 
-    if previous:
-        db_record_end = await Record.find_one(
-            Record.user_id == db_user.id,
-            Record.timestamp == record_timestamp_end,
-        )
-        if not db_record_end:
-            return 0
+        case _:
+            return None
 
-        db_record_start = await Record.find_one(
-            Record.user_id == db_user.id,
-            Record.timestamp >= record_timestamp_start,
-            Record.timestamp < record_timestamp_end,
-        )
-        if not db_record_start:
-            return 0
+    return record_timestamp_start, record_timestamp_end
 
-        score_end = db_record_end.submissions.score
-        score_start = db_record_start.submissions.score
-        return score_end - score_start
 
-    else:
-        current_score = db_user.stats.submissions.score
-        db_record = await Record.find_one(
-            Record.user_id == db_user.id,
-            Record.timestamp >= record_timestamp_end,
+async def load_period_scores(db_user: User, as_of: datetime) -> PeriodScores:
+    """
+    Compute a user's period boundary scores from their records.
+
+    The start scores are taken from the first record in each period, and the previous
+    scores from the first record in the previous period and the record that ended it.
+    Records after the day of `as_of` are ignored.
+
+    :param db_user: The user.
+    :param as_of: The start of the day to compute the scores for.
+
+    :return: The period boundary scores.
+    """
+    boundaries = {
+        period: period_boundaries(period, as_of) for period in PERIOD_SCORE_FIELDS
+    }
+    earliest = min(start for start, _ in boundaries.values())  # type: ignore
+
+    rows = await record_scores(db_user.id, earliest, as_of + timedelta(days=1))
+
+    period_scores = PeriodScores(as_of=as_of)
+    for period, (start_field, previous_field) in PERIOD_SCORE_FIELDS.items():
+        period_start, period_end = boundaries[period]  # type: ignore
+
+        start_score = next((score for t, score in rows if t >= period_end), None)
+        previous_start_score = next(
+            (score for t, score in rows if period_start <= t < period_end), None
         )
-        if not db_record:
-            return 0
+        previous_end_score = next((score for t, score in rows if t == period_end), None)
 
-        previous_score = db_record.submissions.score
-        return current_score - previous_score
+        setattr(period_scores, start_field, start_score)
+        if previous_start_score is not None and previous_end_score is not None:
+            setattr(
+                period_scores, previous_field, previous_end_score - previous_start_score
+            )
+
+    return period_scores
 
 
-async def user_win_count(db_user: User, server_id: int, period: Period) -> int:
+async def advance_period_scores(db_user: User, record: Record) -> PeriodScores:
     """
-    Returns the win count for a given period for a user.
+    Update a user's period boundary scores with the record written at midnight.
 
-    :param db_user: The user to retrieve the win count for.
-    :param server_id: The server to retrieve the win count for.
-    :param period: The period for which to retrieve the win count.
+    The scores of the previous day are advanced without any queries, and are only
+    recomputed from the records if they are missing or out of date.
 
-    :return: The win count for the specified period.
+    :param db_user: The user.
+    :param record: The user's record for the start of today.
+
+    :return: The period boundary scores for today.
     """
-    db_profile = await Profile.find_one(
-        Profile.user_id == db_user.id, Profile.server_id == server_id
-    )
+    today = record.timestamp
+    yesterday = today - timedelta(days=1)
+
+    previous_scores = db_user.period_scores
+    if not previous_scores or as_utc(previous_scores.as_of) != yesterday:
+        previous_scores = await load_period_scores(db_user, yesterday)
+
+    score = record.submissions.score
+    period_scores = PeriodScores(as_of=today)
+
+    for period, (start_field, previous_field) in PERIOD_SCORE_FIELDS.items():
+        previous_start_score = getattr(previous_scores, start_field)
+
+        # The period starts today, so yesterday's period just ended at this record.
+        if period_boundaries(period, today)[1] == today:  # type: ignore
+            setattr(period_scores, start_field, score)
+            setattr(
+                period_scores,
+                previous_field,
+                (
+                    score - previous_start_score
+                    if previous_start_score is not None
+                    else 0
+                ),
+            )
+        else:
+            # If there was no record in the period yet, this record is its first.
+            setattr(
+                period_scores,
+                start_field,
+                previous_start_score if previous_start_score is not None else score,
+            )
+            setattr(
+                period_scores, previous_field, getattr(previous_scores, previous_field)
+            )
+
+    return period_scores
+
+
+def score_stages(period: Period, previous: bool) -> list[dict]:
+    """
+    Build the aggregation stages that compute each user's score for a period from
+    their period boundary scores.
+
+    The stages expect every input document to have the user's current score as
+    `user.score` and their period boundary scores as `user.period_scores`, and add the
+    score as a `score` field. Boundary scores from before the current period started
+    are out of date, which means the user has no record in the current period yet, so
+    their score is 0.
+
+    :param period: The period for which to compute the scores.
+    :param previous: Whether to compute the scores for the previous period.
 
-    if not db_profile or not db_profile.win_count:
+    :return: The aggregation stages.
+    """
+    current_score = "$user.score"
+
+    if period not in PERIOD_SCORE_FIELDS:
+        return [{"$addFields": {"score": current_score}}]
+
+    start_field, previous_field = PERIOD_SCORE_FIELDS[period]
+    up_to_date = {"$gte": ["$user.period_scores.as_of", current_period_start(period)]}
+
+    if previous:
+        score = {"$ifNull": [f"$user.period_scores.{previous_field}", 0]}
+    else:
+        start_score = {"$ifNull": [f"$user.period_scores.{start_field}", current_score]}
+        score = {"$subtract": [current_score, start_score]}
+
+    return [{"$addFields": {"score": {"$cond": [up_to_date, score, 0]}}}]
+
+
+def win_count_field(server_id: int, period: Period) -> str | int:
+    """
+    Get the profile field holding the win count for a period.
+
+    :param server_id: The server the profiles belong to.
+    :param period: The period.
+
+    :return: The field path, or 0 if win counts don't apply.
+    """
+    # Win counts aren't tracked for the global leaderboard.
+    if server_id == GLOBAL_LEADERBOARD_ID:
         return 0
 
     match period:
         case Period.DAY:
-            return db_profile.win_count.days
+            return "$win_count.days"
         case Period.WEEK:
-            return db_profile.win_count.weeks
+            return "$win_count.weeks"
         case Period.MONTH:
-            return db_profile.win_count.months
+            return "$win_count.months"
         case _:
             return 0
 
 
-async def user_score_and_wins(
-    db_user: User, period: Period, previous: bool, server_id: int | None = None
-) -> tuple[User, int, int]:
+async def leaderboard_ranking(
+    server_id: int, period: Period, previous: bool, sort_by: LeaderboardSortBy
+) -> LeaderboardRanking:
     """
-    Get the score and wins for a given period for a user.
+    Compute the leaderboard ranking of a server in a single aggregation, joining the
+    server's profiles with their users.
+
+    Only the ids, scores and win counts are fetched, and they are streamed straight
+    into the ranking's buffers.
+
+    :param server_id: The server's id.
+    :param period: The period for which to compute the scores.
+    :param previous: Whether to compute the leaderboard of one period before.
+    :param sort_by: Sorting method.
+
+    :return: The ranking.
+    """
+    pipeline = [
+        {"$match": {"server_id": server_id}},
+        {
+            "$lookup": {
+                "from": User.get_collection_name(),
+                "localField": "user_id",
+                "foreignField": "_id",
+                "pipeline": [
+                    {
+                        "$project": {
+                            "_id": 0,
+                            "score": "$stats.submissions.score",
+                            "period_scores": 1,
+                        }
+                    }
+                ],
+                "as": "user",
+            }
+        },
+        {"$unwind": "$user"},
+        *score_stages(period, previous),
+        {
+            "$project": {
+                "_id": 0,
+                "user_id": 1,
+                "score": 1,
+                "win_count": {"$ifNull": [win_count_field(server_id, period), 0]},
+            }
+        },
+    ]
+
+    user_ids, scores, win_counts = array(INT64), array(INT64), array(INT64)
+    async for row in Profile.aggregate(pipeline):
+        user_ids.append(row["user_id"])
+        scores.append(row["score"])
+        win_counts.append(row["win_count"])
+
+    return LeaderboardRanking.from_columns(sort_by, user_ids, scores, win_counts)
 
-    :param db_user: The user to retrieve the score and wins for.
-    :param period: The period for which to retrieve the score.
-    :param previous: Whether to display the leaderboard of one period before.
-    :param server_id: The ID of the server to retrieve the user's win_count for.
 
-    :return: A tuple of the user, their score and wins.
+async def previous_period_scores(period: Period) -> dict[int, int]:
     """
-    score = await user_score(db_user, period, previous)
+    Compute every user's score for the previous period from their period boundary
+    scores, in a single aggregation.
 
-    win_count = 0
-    if server_id:
-        win_count = await user_win_count(db_user, server_id, period)
+    :param period: The period.
+
+    :return: The scores, keyed by user id.
+    """
+    pipeline = [
+        {
+            "$project": {
+                "user": {
+                    "score": "$stats.submissions.score",
+                    "period_scores": "$period_scores",
+                }
+            }
+        },
+        *score_stages(period, previous=True),
+        {"$project": {"score": 1}},
+    ]
 
-    return db_user, score, win_count
+    return {row["_id"]: row["score"] async for row in User.aggregate(pipeline)}
 
 
-async def all_users_scores_and_wins(
-    db_users: list[User], period: Period, previous: bool, server_id: int | None = None
-) -> list[tuple[User, int, int]]:
+async def leaderboard_profiles(
+    server_id: int, user_ids: list[int]
+) -> dict[int, LeaderboardProfile]:
     """
-    Fetch and calculate the scores and wins for all users, for the selected time period.
+    Fetch the display details of the users shown on a leaderboard page.
 
-    :param db_users: The users in the server.
-    :param period: The period for which to retrieve and sort the scores.
-    :param previous: Whether to display the leaderboard of one period before.
-    :param server_id: The ID of the server to retrieve the user's win_count for.
+    :param server_id: The server's id.
+    :param user_ids: The ids of the users on the page.
 
-    :return: A list of users with their scores and wins.
+    :return: The display details, keyed by user id.
     """
-    coroutines = [
-        user_score_and_wins(db_user, period, previous, server_id)
-        for db_user in db_users
+    pipeline = [
+        {"$match": {"server_id": server_id, "user_id": {"$in": user_ids}}},
+        {
+            "$lookup": {
+                "from": User.get_collection_name(),
+                "localField": "user_id",
+                "foreignField": "_id",
+                "pipeline": [{"$project": {"_id": 0, "leetcode_id": 1}}],
+                "as": "user",
+            }
+        },
+        {"$unwind": "$user"},
+        {
+            "$project": {
+                "_id": 0,
+                "user_id": 1,
+                "leetcode_id": "$user.leetcode_id",
+                "name": "$preference.name",
+                "url": "$preference.url",
+                "anonymous": "$preference.anonymous",
+            }
+        },
     ]
-    users_with_scores_and_wins = await asyncio.gather(*coroutines)
-    return users_with_scores_and_wins
 
+    rows = await Profile.aggregate(pipeline).to_list()
+    return {row.pop("user_id"): LeaderboardProfile(**row) for row in rows}
 
-async def users_from_profiles(
-    server_id: int,
-) -> tuple[dict[int, Profile], list[User]]:
+
+def current_period_start(period: Period) -> datetime | None:
+    """
+    Get the start of the current period, which identifies the period a leaderboard
+    snapshot was computed in.
+
+    :param period: The period.
+
+    :return: The start of the current period, or None for all-time.
+    """
+    if not (boundaries := period_boundaries(period)):
+        return None
+
+    return boundaries[1]
+
+
+async def snapshot_leaderboard_ranking(
+    server_id: int, period: Period, previous: bool, sort_by: LeaderboardSortBy
+) -> LeaderboardRanking:
     """
-    Retrieves the users that are part of a server, and their respective profiles.
+    Get the leaderboard ranking of a server from its snapshot, computing and storing it
+    if there is no snapshot for the current period.
+
+    :param server_id: The server's id.
+    :param period: The period for which to get the scores.
+    :param previous: Whether to get the leaderboard of one period before.
+    :param sort_by: Sorting method.
 
-    :param server_id: the server to retrieve the users that are in it.
+    :return: The ranking.
     """
-    db_profiles = await Profile.find_many(Profile.server_id == server_id).to_list()
+    period_start = current_period_start(period)
 
-    user_id_to_profile = {db_profile.user_id: db_profile for db_profile in db_profiles}
+    if ranking := await find_leaderboard_snapshot(
+        server_id, period, previous, sort_by, period_start
+    ):
+        return ranking
 
-    db_users = await User.find_many(
-        In(User.id, set(user_id_to_profile.keys()))
+    ranking = await leaderboard_ranking(server_id, period, previous, sort_by)
+    await save_leaderboard_snapshot(
+        server_id, period, previous, sort_by, period_start, ranking
+    )
+
+    return ranking
+
+
+async def rebuild_leaderboard_snapshots(server_ids: list[int]) -> None:
+    """
+    Recompute the stored leaderboards of servers after a stats refresh.
+
+    Only leaderboards that have already been viewed are stored, so only those are
+    recomputed, and the rest are computed when first viewed. Leaderboards of the
+    previous period are skipped as they can't change until the period rolls over,
+    at which point they are invalidated once the period's reset has finished.
+
+    :param server_ids: The ids of the servers whose members' scores changed.
+    """
+    if not server_ids:
+        return
+
+    db_snapshots = await LeaderboardSnapshot.find_many(
+        In(LeaderboardSnapshot.server_id, server_ids),
+        LeaderboardSnapshot.previous == False,  # noqa: E712
     ).to_list()
 
-    return user_id_to_profile, db_users
+    semaphore = asyncio.Semaphore(SNAPSHOT_REBUILD_CONCURRENCY)
+
+    async def rebuild(db_snapshot: LeaderboardSnapshot) -> None:
+        async with semaphore:
+            ranking = await leaderboard_ranking(
+                db_snapshot.server_id,
+                db_snapshot.period,
+                db_snapshot.previous,
+                db_snapshot.sort_by,
+            )
+            await save_leaderboard_snapshot(
+                db_snapshot.server_id,
+                db_snapshot.period,
+                db_snapshot.previous,
+                db_snapshot.sort_by,
+                current_period_start(db_snapshot.period),
+                ranking,
+            )
+
+    await asyncio.gather(*(rebuild(db_snapshot) for db_snapshot in db_snapshots))
+
+    statsd.increment("leaderboards.snapshots.rebuilt", len(db_snapshots))
 
 
 async def generate_leaderboard_embed(
@@ -192,10 +467,14 @@ async def generate_leaderboard_embed(
     previous: bool = False,
     page: int = 1,
     users_per_page: int = 10,
+    centre_on_author: bool = False,
 ) -> tuple[discord.Embed, discord.ui.View | None]:
     """
     Generate a leaderboard embed.
 
+    Only the requested page is rendered, and the view renders the other pages as they
+    are paged to.
+
     :param period: The period.
     :param server_id: The server's id.
     :param sort_by: Sorting method
@@ -205,6 +484,8 @@ async def generate_leaderboard_embed(
     :param previous: Whether to display the leaderboard of one period before.
     :param page: The page number.
     :param users_per_page: The number of users per page.
+    :param centre_on_author: Whether to open the page containing the author's place
+    instead of `page`, if the author is on the leaderboard.
 
     :return: The leaderboard embed and view.
     """
@@ -212,125 +493,98 @@ async def generate_leaderboard_embed(
     db_server = await Server.find_one(Server.id == server_id, fetch_links=True)
     if not db_server:
         return empty_leaderboard_embed(), None
-    user_id_to_profile, users = await users_from_profiles(server_id)
-    users_with_scores_and_wins = await all_users_scores_and_wins(
-        users, period, previous, server_id
-    )
+    ranking = await snapshot_leaderboard_ranking(server_id, period, previous, sort_by)
+    num_pages = max(math.ceil(len(ranking) / users_per_page), 1)
 
-    match sort_by:
-        case LeaderboardSortBy.WIN_COUNT:
-            sorted_users_with_metrics = sorted(
-                users_with_scores_and_wins, key=lambda pair: pair[2], reverse=True
-            )
-        case _:
-            sorted_users_with_metrics = sorted(
-                users_with_scores_and_wins, key=lambda pair: pair[1], reverse=True
-            )
+    async def render_page(page_index: int) -> discord.Embed:
+        if not ranking:
+            return empty_leaderboard_embed()
 
-    pages: list[discord.Embed] = []
-    num_pages = math.ceil(len(users) / users_per_page)
+        start = page_index * users_per_page
+        profiles = await leaderboard_profiles(
+            server_id, ranking.user_ids[start : start + users_per_page].tolist()
+        )
 
-    place = 0
-    prev_metric_value = float("-inf")
-    for page_index in range(num_pages):
-        page_embed, place, prev_score = await build_leaderboard_page(
+        return build_leaderboard_page(
             period,
             sort_by,
             db_server,
-            user_id_to_profile,
-            sorted_users_with_metrics,
+            ranking,
+            profiles,
             winners_only,
             global_leaderboard,
             page_index,
             users_per_page,
             num_pages,
-            place,
-            prev_metric_value,
         )
-        pages.append(page_embed)
 
-    if len(pages) == 0:
-        embed = empty_leaderboard_embed()
-        pages.append(embed)
+    if (
+        centre_on_author
+        and author_user_id is not None
+        and (position := ranking.position(author_user_id)) is not None
+    ):
+        page = position // users_per_page + 1
+
+    page = min(max(page - 1, 0), num_pages - 1)
 
-    page = max(page - 1, 0)
-    view = None if winners_only else LeaderboardPagination(author_user_id, pages, page)
+    if winners_only:
+        return await render_page(page), None
 
-    return pages[page], view
+    view = LeaderboardPagination(author_user_id, render_page, num_pages, page)
+    return await view.get_page(page), view
 
 
-async def build_leaderboard_page(
+def build_leaderboard_page(
     period: Period,
     sort_by: LeaderboardSortBy,
     db_server: Server,
-    user_id_to_profile: dict[int, Profile],
-    sorted_users: list[tuple[User, int, int]],
+    ranking: LeaderboardRanking,
+    profiles: dict[int, LeaderboardProfile],
     winners_only: bool,
     global_leaderboard: bool,
     page_index: int,
     users_per_page: int,
     num_pages: int,
-    place: int,
-    prev_metric_value: float,
-) -> tuple[discord.Embed, int, float]:
+) -> discord.Embed:
     """
     Build a leaderboard page.
 
     :param period: The period.
     :param sort_by: Sorting method
     :param db_server: The server.
-    :param user_id_to_profile: Mapping from user ids to their profile.
-    :param sorted_users: The list of users sorted by selected metric
-    (score or win count) in the respective period.
+    :param ranking: The leaderboard ranking by selected metric (score or win count) in
+    the respective period.
+    :param profiles: The display details of the users on the page, keyed by user id.
     :param winners_only: Whether to display only the winners.
     :param global_leaderboard: Whether to display the global leaderboard.
     :param page_index: The page index.
     :param users_per_page: The number of users per page.
     :param num_pages: The number of pages.
-    :param place: The place.
-    :param prev_metric_value: The previous metric value.
 
-    :return: The leaderboard page, place, and previous metric value.
+    :return: The leaderboard page.
     """
 
     leaderboard = []
+    metric_label = "wins" if sort_by == LeaderboardSortBy.WIN_COUNT else "pts"
 
-    for user, score, win_count in sorted_users[
-        page_index * users_per_page : page_index * users_per_page + users_per_page
-    ]:
-
-        profile_link = f"https://leetcode.com/{user.leetcode_id}"
-
-        profile = user_id_to_profile[user.id]
-
-        if not profile:
-            # ! would actually lead to error. Assert
-            continue
-
-        name = profile.preference.name
-        url = profile.preference.url
-        anonymous = profile.preference.anonymous
-
-        match sort_by:
-            case LeaderboardSortBy.WIN_COUNT:
-                display_metric = win_count
-                metric_label = "wins"
-            case _:
-                display_metric = score
-                metric_label = "pts"
-
-        if display_metric != prev_metric_value:
-            place += 1
+    start = page_index * users_per_page
+    for i in range(start, min(start + users_per_page, len(ranking))):
+        display_metric = ranking.metrics[i]
+        place = ranking.places[i]
 
         if winners_only and (display_metric == 0 or place == 4):
             break
 
-        prev_metric_value = display_metric
+        # The profile was deleted since the ranking was computed.
+        if not (profile := profiles.get(ranking.user_ids[i])):
+            continue
+
+        profile_link = f"https://leetcode.com/{profile.leetcode_id}"
 
         display_name = (
             "Anonymous User"
-            if anonymous and global_leaderboard
-            else (f"[{name}]({profile_link})" if url else name)
+            if profile.anonymous and global_leaderboard
+            else (f"[{profile.name}]({profile_link})" if profile.url else profile.name)
         )
 
         rank = get_rank_emoji(place, display_metric)
@@ -340,17 +594,13 @@ async def build_leaderboard_page(
 
     title = get_title(period, winners_only, global_leaderboard, sort_by)
 
-    return (
-        leaderboard_embed(
-            db_server,
-            page_index,
-            num_pages,
-            title,
-            "\n".join(leaderboard),
-            include_page_count=not winners_only,
-        ),
-        place,
-        prev_metric_value,
+    return leaderboard_embed(
+        db_server,
+        page_index,
+        num_pages,
+        title,
+        "\n".join(leaderboard),
+        include_page_count=not winners_only,
     )
 
 
@@ -450,45 +700,128 @@ def get_rank_emoji(place: int, score: int) -> str:
     return rf"{place}\."
 
 
-async def send_leaderboard_winners(
-    bot: "DiscordBot", db_server: Server, period: Period
-) -> None:
+async def previous_period_rankings(
+    server_ids: list[int], scores: dict[Period, dict[int, int]]
+) -> dict[int, dict[Period, LeaderboardRanking]]:
     """
-    Send the leaderboard winners to the specified channels on a Discord server.
+    Compute the score rankings of the previous periods of many servers at once.
+
+    The scores are computed once per period for every user, with
+    `previous_period_scores`, and the members and win counts of all the servers are
+    read in a single pass over their profiles, so no queries are made per server.
 
-    Sends the leaderboard winners' embed to a list of specified channels
-    within a given Discord server. It checks each channel to ensure it's valid and a
-    text channel, and handles forbidden (permission-related) errors when attempting to
-    send the embed.
+    :param server_ids: The servers' ids, excluding the global leaderboard.
+    :param scores: Every user's score of each period's previous period, keyed by user
+    id.
 
-    :param db_server: The server instance containing the list of channel IDs where the
-    leaderboard winners will be announced.
-    :param period: The period for which the leaderboard is being sent (e.g., weekly,
-    monthly).
+    :return: The rankings of each period, keyed by server id.
     """
+    # {server_id: (user_ids, {period: (scores, win_counts)})}
+    columns: dict[int, tuple[array, dict[Period, tuple[array, array]]]] = {
+        server_id: (
+            array(INT64),
+            {period: (array(INT64), array(INT64)) for period in scores},
+        )
+        for server_id in server_ids
+    }
 
-    for channel_id in db_server.channels.winners:
-        channel = bot.get_channel(channel_id)
+    async for row in Profile.aggregate(
+        [
+            {"$match": {"server_id": {"$in": server_ids}}},
+            {"$project": {"_id": 0, "server_id": 1, "user_id": 1, "win_count": 1}},
+        ]
+    ):
+        user_ids, period_columns = columns[row["server_id"]]
+        user_ids.append(row["user_id"])
+
+        win_count = row.get("win_count") or {}
+        for period, (period_scores, win_counts) in period_columns.items():
+            period_scores.append(scores[period].get(row["user_id"], 0))
+            win_counts.append(win_count.get(WIN_COUNT_FIELDS[period], 0))
+
+    return {
+        server_id: {
+            period: LeaderboardRanking.from_columns(
+                LeaderboardSortBy.SCORE, user_ids, period_scores, win_counts
+            )
+            for period, (period_scores, win_counts) in period_columns.items()
+        }
+        for server_id, (user_ids, period_columns) in columns.items()
+    }
 
-        if not channel or not isinstance(channel, discord.TextChannel):
-            continue
 
-        try:
-            embed, view = await generate_leaderboard_embed(
-                period,
-                db_server.id,
-                LeaderboardSortBy.SCORE,
-                winners_only=True,
-                previous=True,
-            )
+async def winners_embed(
+    period: Period,
+    db_server: Server,
+    ranking: LeaderboardRanking,
+    users_per_page: int = 10,
+) -> discord.Embed:
+    """
+    Render the winners leaderboard of a server's previous period, the same as
+    `generate_leaderboard_embed` with `winners_only`.
 
-            await channel.send(embed=embed, view=view, silent=True)  # type: ignore
+    :param period: The period.
+    :param db_server: The server.
+    :param ranking: The server's score ranking of the previous period.
+    :param users_per_page: The number of users per page.
 
-        except discord.errors.Forbidden:
-            bot.logger.exception(
-                f"Leaderboard posting failed | Channel ID: {channel_id}"
-            )
+    :return: The winners embed.
+    """
+    if not ranking:
+        return empty_leaderboard_embed()
 
+    profiles = await leaderboard_profiles(
+        db_server.id, ranking.user_ids[:users_per_page].tolist()
+    )
+
+    return build_leaderboard_page(
+        period,
+        LeaderboardSortBy.SCORE,
+        db_server,
+        ranking,
+        profiles,
+        winners_only=True,
+        global_leaderboard=False,
+        page_index=0,
+        users_per_page=users_per_page,
+        num_pages=max(math.ceil(len(ranking) / users_per_page), 1),
+    )
+
+
+def leaderboard_winners_deliveries(
+    channels: list[discord.TextChannel], embed: discord.Embed
+) -> list[Delivery]:
+    """
+    Build the deliveries of a rendered winners leaderboard to a server's winners
+    channels.
+
+    :param channels: The server's resolved winners channels.
+    :param embed: The winners embed, shared by all the channels.
+
+    :return: The deliveries.
+    """
+    return [
+        Delivery(channel.id, leaderboard_winners_sender(channel, embed))
+        for channel in channels
+    ]
+
+
+def leaderboard_winners_sender(
+    channel: discord.TextChannel, embed: discord.Embed
+) -> Callable[[], Awaitable[None]]:
+    """
+    Create the function that posts the leaderboard winners to a channel.
+
+    :param channel: The channel.
+    :param embed: The winners embed.
+
+    :return: The send function of the delivery.
+    """
+
+    async def send() -> None:
+        await channel.send(embed=embed, silent=True)
         statsd.increment(
             "discord.bot.notifications.sent", tags=["type:leaderboard_winners"]
         )
+
+    return send
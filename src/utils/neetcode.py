@@ -4,7 +4,7 @@ from collections import defaultdict
 from dataclasses import dataclass
 from typing import TYPE_CHECKING, DefaultDict
 
-from src.constants import Language, ProblemList
+from src.constants import Language, ProblemList, RequestPriority
 
 if TYPE_CHECKING:
     # To prevent circular imports
@@ -52,7 +52,9 @@ class NeetcodeSolutions:
 
         if not (
             response_data := await self.bot.http_client.fetch_data(
-                f"https://neetcode.io/{main_js_filename}", timeout=10
+                f"https://neetcode.io/{main_js_filename}",
+                timeout=10,
+                priority=RequestPriority.BACKGROUND,
             )
         ):
             return {}
@@ -69,7 +71,7 @@ class NeetcodeSolutions:
         """
         if not (
             response_data := await self.bot.http_client.fetch_data(
-                "https://neetcode.io/", timeout=10
+                "https://neetcode.io/", timeout=10, priority=RequestPriority.BACKGROUND
             )
         ):
             return
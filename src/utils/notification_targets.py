@@ -0,0 +1,163 @@
+from typing import TYPE_CHECKING
+
+import discord
+from datadog.dogstatsd.base import statsd
+from pymongo import UpdateOne
+
+from src.constants import (
+    CHANNEL_FAILURE_LIMIT,
+    NOTIFICATION_PERMISSIONS,
+    NotificationOptions,
+)
+from src.database.models import Server
+
+if TYPE_CHECKING:
+    # To prevent circular imports
+    from src.bot import DiscordBot
+
+
+class NotificationTargets:
+    """
+    Resolves the channels a notification is broadcast to, and keeps track of the ones
+    that can't be delivered to.
+
+    Channels are resolved and validated once per broadcast, and are only judged for
+    the notification being broadcast, as each notification needs different
+    permissions. A channel that was deleted or isn't a text channel is dead, and is
+    removed from its server's channels for the notification. A channel the bot is
+    missing the notification's permissions in counts as a failure, and is removed once
+    it has failed `CHANNEL_FAILURE_LIMIT` broadcasts in a row. Channels are only judged
+    whilst their guild is available, as the channel cache of an unavailable guild is
+    incomplete.
+
+    The failure counts and removals are written in a single bulk write by `flush`,
+    which the broadcaster calls once each broadcast has been sent.
+
+    :param bot: The Discord bot instance.
+    :param notification_option: The notification being broadcast, which selects the
+    server's channels.
+    """
+
+    def __init__(
+        self, bot: "DiscordBot", notification_option: NotificationOptions
+    ) -> None:
+        self.bot = bot
+        self.notification_option = notification_option
+        self.permissions = NOTIFICATION_PERMISSIONS[notification_option]
+
+        # {server_id: {channel_id: failure count}}
+        self.failures: dict[int, dict[int, int]] = {}
+        # {server_id: {channel_id}} of channels with previous failures that succeeded.
+        self.recovered: dict[int, set[int]] = {}
+        # {server_id: {channel_id}}
+        self.dead: dict[int, set[int]] = {}
+        # {channel_id: server_id}
+        self.servers: dict[int, int] = {}
+        # {channel_id: failure count before this broadcast}
+        self.previous_failures: dict[int, int] = {}
+
+    def resolve(self, db_server: Server) -> list[discord.TextChannel]:
+        """
+        Resolve a server's channels for the notification, skipping the channels that
+        can't be delivered to.
+
+        :param db_server: The server.
+
+        :return: The deliverable channels.
+        """
+        guild = self.bot.get_guild(db_server.id)
+        if not guild or guild.unavailable:
+            return []
+
+        channels = []
+        for channel_id in getattr(db_server.channels, self.notification_option.value):
+            self.servers[channel_id] = db_server.id
+            self.previous_failures[channel_id] = db_server.channel_failures.get(
+                self.notification_option.value, {}
+            ).get(str(channel_id), 0)
+
+            channel = guild.get_channel(channel_id)
+            if not channel or not isinstance(channel, discord.TextChannel):
+                self.dead.setdefault(db_server.id, set()).add(channel_id)
+                continue
+
+            if not channel.permissions_for(guild.me) >= self.permissions:
+                self.record_failure(channel_id)
+                continue
+
+            channels.append(channel)
+
+        return channels
+
+    def record_success(self, channel_id: int) -> None:
+        """
+        Record that a notification was delivered to a channel, clearing its failures.
+
+        :param channel_id: The channel's id.
+        """
+        if self.previous_failures.get(channel_id):
+            self.recovered.setdefault(self.servers[channel_id], set()).add(channel_id)
+
+    def record_failure(self, channel_id: int) -> None:
+        """
+        Record that a notification couldn't be delivered to a channel, such as when the
+        bot is missing permissions.
+
+        :param channel_id: The channel's id.
+        """
+        server_id = self.servers[channel_id]
+        failures = self.previous_failures.get(channel_id, 0) + 1
+
+        if failures >= CHANNEL_FAILURE_LIMIT:
+            self.dead.setdefault(server_id, set()).add(channel_id)
+        else:
+            self.failures.setdefault(server_id, {})[channel_id] = failures
+
+    async def flush(self) -> None:
+        """
+        Write the failure counts, and remove the dead channels from their servers'
+        channels for the notification.
+        """
+        server_ids = self.failures.keys() | self.recovered.keys() | self.dead.keys()
+        if not server_ids:
+            return
+
+        updates = []
+        for server_id in server_ids:
+            failures = self.failures.get(server_id, {})
+            dead = self.dead.get(server_id, set())
+            cleared = self.recovered.get(server_id, set()) | dead
+
+            option = self.notification_option.value
+            update: dict = {}
+            if failures:
+                update["$set"] = {
+                    f"channel_failures.{option}.{channel_id}": count
+                    for channel_id, count in failures.items()
+                }
+            if cleared:
+                update["$unset"] = {
+                    f"channel_failures.{option}.{channel_id}": ""
+                    for channel_id in cleared
+                }
+            if dead:
+                update["$pull"] = {f"channels.{option}": {"$in": list(dead)}}
+
+            updates.append(UpdateOne({"_id": server_id}, update))
+
+        await Server.get_motor_collection().bulk_write(updates, ordered=False)
+
+        dead_count = sum(len(dead) for dead in self.dead.values())
+        if dead_count:
+            self.bot.logger.info(
+                f"Notification channels pruned | "
+                f"Type: {self.notification_option.value} | Channels: {dead_count}"
+            )
+
+        statsd.increment(
+            "discord.bot.notifications.channels.pruned",
+            dead_count,
+            tags=[f"type:{self.notification_option.value}"],
+        )
+
+        self.failures, self.recovered, self.dead = {}, {}, {}
@@ -1,21 +1,48 @@
-from datetime import UTC, datetime
-from typing import TYPE_CHECKING
+import asyncio
+from datetime import UTC, datetime, timedelta
+from typing import TYPE_CHECKING, Awaitable, Callable
 
 import discord
 from beanie.odm.operators.update.general import Set
 from datadog.dogstatsd.base import statsd
 
-from src.constants import GLOBAL_LEADERBOARD_ID, VERIFIED_ROLE, Period
-from src.database.models import Server, User
+from src.constants import (
+    GLOBAL_LEADERBOARD_ID,
+    NotificationOptions,
+    Period,
+    RefreshPhase,
+)
+from src.database.models import RefreshJob, Server, User
 from src.ui.embeds.problems import daily_question_embed
-from src.utils.leaderboards import send_leaderboard_winners
-from src.utils.roles import update_roles
+from src.utils.broadcasts import Broadcaster, Delivery
+from src.utils.leaderboards import (
+    leaderboard_winners_deliveries,
+    previous_period_rankings,
+    previous_period_scores,
+    winners_embed,
+)
+from src.utils.notification_targets import NotificationTargets
+from src.utils.records import as_utc
+from src.utils.refresh_jobs import (
+    checkpointed_servers,
+    complete_phase,
+    finish_refresh_job,
+    missed_resets,
+    phase_completed,
+    unfinished_refresh_jobs,
+)
+from src.utils.roles import update_all_roles
 from src.utils.stats import update_all_user_stats
 
 if TYPE_CHECKING:
     # To prevent circular imports
     from src.bot import DiscordBot
 
+refresh_job_lock = asyncio.Lock()
+# Only jobs started before this process are resumed, as later jobs are run by the
+# process that started them.
+process_started_at = datetime.now(UTC)
+
 
 async def process_daily_question_and_stats_update(
     bot: "DiscordBot",
@@ -27,15 +54,16 @@ async def process_daily_question_and_stats_update(
     """
     Send the daily question and update the stats.
 
+    Period resets that were missed, because the bot was offline when they were due,
+    are applied as well.
+
     :param update_stats: Whether to update the users stats.
     :param force_reset_day: Whether to force the daily reset.
     :param force_reset_week: Whether to force the weekly reset.
     :param force_reset_month: Whether to force the monthly reset.
     """
-    bot.logger.info("Daily tasks started | Beginning notifications and stats update")
-    await bot.channel_logger.info("Started updating")
-
     start = datetime.now(UTC)
+    missed = await missed_resets()
 
     reset_day = (start.hour == 0 and start.minute == 0) or force_reset_day
     reset_week = (
@@ -45,101 +73,246 @@ async def process_daily_question_and_stats_update(
         start.day == 1 and start.hour == 0 and start.minute == 0
     ) or force_reset_month
 
+    if update_stats and any(missed.values()):
+        bot.logger.warning(
+            "Missed period resets found | "
+            f"Day: {missed[Period.DAY]}, Week: {missed[Period.WEEK]}, "
+            f"Month: {missed[Period.MONTH]}"
+        )
+        reset_day = reset_day or missed[Period.DAY]
+        reset_week = reset_week or missed[Period.WEEK]
+        reset_month = reset_month or missed[Period.MONTH]
+
     midday = start.hour == 12 and start.minute == 0
-    should_update_roles = midday
 
-    if reset_day:
-        embed = await daily_question_embed(bot)
+    job = RefreshJob(
+        started_at=start,
+        reset_day=reset_day,
+        reset_week=reset_week,
+        reset_month=reset_month,
+        update_stats=update_stats,
+        update_roles=midday,
+    )
+    await job.insert()
 
-        try:
-            async for db_server in Server.all(fetch_links=True):
-                await send_daily_question(bot, db_server, embed)
-        except discord.errors.HTTPException:
-            bot.logger.exception("Failed to share daily questions to channels")
+    await run_refresh_job(bot, job)
+
+
+async def resume_refresh_jobs(bot: "DiscordBot") -> None:
+    """
+    Resume the refresh jobs that were interrupted by a restart, then apply any period
+    resets that were missed whilst the bot was offline.
+    """
+    async for job in unfinished_refresh_jobs(started_before=process_started_at):
+        # Records and winners are of the day a job started, so a job interrupted more
+        # than a day ago is abandoned, and its resets are applied as missed resets.
+        if datetime.now(UTC) - as_utc(job.started_at) > timedelta(days=1):
+            bot.logger.warning(
+                f"Refresh job abandoned | Job ID: {job.id} | "
+                f"Started at: {job.started_at}"
+            )
+            await finish_refresh_job(job)
+            continue
+
+        bot.logger.warning(
+            f"Refresh job resumed | Job ID: {job.id} | "
+            f"Started at: {job.started_at} | "
+            f"Completed phases: {[phase.value for phase in job.completed_phases]}"
+        )
+        statsd.increment("stats.refresh.job.resumed")
 
-        bot.logger.info("Daily question broadcast completed")
+        await run_refresh_job(bot, job, resumed=True)
 
-    if update_stats:
-        await update_all_user_stats(bot, reset_day, reset_week, reset_month)
+    if any((await missed_resets()).values()):
+        await process_daily_question_and_stats_update(bot)
 
-    enabled_roles_server_count = 0
-    async for db_server in Server.all():
-        await Server.find_one(Server.id == db_server.id).update(
+
+async def run_refresh_job(
+    bot: "DiscordBot", job: RefreshJob, resumed: bool = False
+) -> None:
+    """
+    Run the phases of a refresh job that haven't completed, in order.
+
+    :param job: The refresh job.
+    :param resumed: Whether the job was interrupted by a restart and is being resumed.
+    """
+    # Jobs resumed on startup must not overlap with the scheduled jobs.
+    async with refresh_job_lock:
+        if resumed:
+            # The job may have progressed since it was read, so its phases are read
+            # again now that no other job is running.
+            job = await RefreshJob.get(job.id)  # type: ignore
+            if not job or job.finished_at:
+                return
+
+        bot.logger.info(
+            "Daily tasks started | Beginning notifications and stats update"
+        )
+        await bot.channel_logger.info("Started updating")
+
+        if job.reset_day and not phase_completed(job, RefreshPhase.DAILY_QUESTION):
+            embed = await daily_question_embed(bot)
+            targets = NotificationTargets(bot, NotificationOptions.DAILY_QUESTION)
+            broadcaster = Broadcaster(bot, "daily_question", targets)
+
+            async for db_servers in checkpointed_servers(job):
+                await broadcaster.broadcast(
+                    delivery
+                    for db_server in db_servers
+                    for delivery in daily_question_deliveries(
+                        bot, targets.resolve(db_server), embed
+                    )
+                )
+
+            await complete_phase(job, RefreshPhase.DAILY_QUESTION)
+            bot.logger.info("Daily question broadcast completed")
+
+        if job.update_stats:
+            await update_all_user_stats(bot, job, resumed=resumed)
+
+        # Before the winners are sent, as their embeds show when the stats were updated.
+        await Server.find_all().update(
             Set(
                 {
-                    Server.last_update_start: start,
+                    Server.last_update_start: job.started_at,
                     Server.last_update_end: datetime.now(UTC),
                 }
             )
         )  # type: ignore
 
-        if db_server.id == GLOBAL_LEADERBOARD_ID:
-            continue
+        if (job.reset_day or job.reset_week or job.reset_month) and not (
+            phase_completed(job, RefreshPhase.WINNERS)
+        ):
+            periods = [
+                period
+                for period, reset in (
+                    (Period.DAY, job.reset_day),
+                    (Period.WEEK, job.reset_week),
+                    (Period.MONTH, job.reset_month),
+                )
+                if reset
+            ]
+            await send_leaderboard_winners(bot, job, periods)
+            await complete_phase(job, RefreshPhase.WINNERS)
 
-        if reset_day:
-            await send_leaderboard_winners(bot, db_server, Period.DAY)
-
-        if reset_week:
-            await send_leaderboard_winners(bot, db_server, Period.WEEK)
-
-        if reset_month:
-            await send_leaderboard_winners(bot, db_server, Period.MONTH)
-
-        if should_update_roles:
-            # Only update roles for servers that have the VERIFIED_ROLE.
-            if (guild := bot.get_guild(db_server.id)) and discord.utils.get(
-                guild.roles, name=VERIFIED_ROLE
-            ):
-                try:
-                    await update_roles(guild, db_server.id)
-                    enabled_roles_server_count += 1
-                except discord.errors.Forbidden:
-                    # Missing permissions are handled inside update_roles, so it
-                    # shouldn't raise an error.
-                    bot.logger.warning(
-                        f"Role update forbidden | Server ID: {db_server.id}"
-                    )
+        if job.update_roles and not phase_completed(job, RefreshPhase.ROLES):
+            enabled_roles_server_count = await update_all_roles(bot)
+            await complete_phase(job, RefreshPhase.ROLES)
+            statsd.gauge("discord.bot.roles.servers.count", enabled_roles_server_count)
 
-    if should_update_roles:
-        statsd.gauge("discord.bot.roles.servers.count", enabled_roles_server_count)
+        await finish_refresh_job(job)
 
-    bot.logger.info(
-        "Daily tasks completed | Notifications sent and stats updated successfully"
-    )
-    await bot.channel_logger.info("Completed updating", include_error_counts=True)
+        bot.logger.info(
+            "Daily tasks completed | Notifications sent and stats updated successfully"
+        )
+        await bot.channel_logger.info("Completed updating", include_error_counts=True)
 
     statsd.gauge("db.servers.count", await Server.all().count())
     statsd.gauge("db.users.count", await User.all().count())
 
 
-async def send_daily_question(
-    bot: "DiscordBot", db_server: Server, embed: discord.Embed
-) -> None:
+def daily_question_deliveries(
+    bot: "DiscordBot", channels: list[discord.TextChannel], embed: discord.Embed
+) -> list[Delivery]:
     """
-    Send the daily question to the server's daily question channels.
+    Build the deliveries of the daily question to a server's daily question channels.
 
-    :param db_server: The server to send the daily question to (with links fetched).
+    :param channels: The server's resolved daily question channels.
     :param embed: The embed containing the daily question.
+
+    :return: The deliveries.
     """
-    for channel_id in db_server.channels.daily_question:
-        channel = bot.get_channel(channel_id)
+    return [
+        Delivery(channel.id, daily_question_sender(bot, channel, embed))
+        for channel in channels
+    ]
 
-        if not channel or not isinstance(channel, discord.TextChannel):
-            continue
 
-        try:
+def daily_question_sender(
+    bot: "DiscordBot", channel: discord.TextChannel, embed: discord.Embed
+) -> Callable[[], Awaitable[None]]:
+    """
+    Create the function that posts the daily question to a channel and opens a thread
+    on it.
+
+    The message is only posted once, so a retry after the thread failed to be created
+    doesn't post it again. The question is delivered once it's posted, so a channel
+    where the bot can't create threads is only logged, rather than failing the
+    delivery.
+
+    :param channel: The channel.
+    :param embed: The embed containing the daily question.
+
+    :return: The send function of the delivery.
+    """
+    message: discord.Message | None = None
+
+    async def send() -> None:
+        nonlocal message
+        if message is None:
             message = await channel.send(embed=embed, silent=True)
 
+        try:
             await channel.create_thread(
                 name=embed.title if embed.title else "Daily Question",
                 message=message,
                 auto_archive_duration=1440,  # in minutes (1 day).
             )
-
         except discord.errors.Forbidden:
             bot.logger.warning(
-                "Cannot post daily question | Missing permissions | "
-                f"Channel ID: {channel_id}"
+                "Cannot create daily question thread | Missing permissions | "
+                f"Channel ID: {channel.id}"
             )
 
         statsd.increment("discord.bot.notifications.sent", tags=["type:daily_question"])
+
+    return send
+
+
+async def send_leaderboard_winners(
+    bot: "DiscordBot", job: RefreshJob, periods: list[Period]
+) -> None:
+    """
+    Send the winners of the previous periods to every server's winners channels.
+
+    The scores of each period are computed once for all users, each server's rankings
+    for every period are computed in one pass over its profiles, and each winners
+    embed is rendered once and shared by all of the server's winners channels.
+
+    :param job: The refresh job, whose server checkpoint is advanced.
+    :param periods: The periods that were reset.
+    """
+    scores = {period: await previous_period_scores(period) for period in periods}
+    targets = NotificationTargets(bot, NotificationOptions.WINNERS)
+    broadcaster = Broadcaster(bot, "leaderboard_winners", targets)
+
+    async for db_servers in checkpointed_servers(job):
+        # {server_id: channels}
+        server_channels = {
+            db_server.id: channels
+            for db_server in db_servers
+            if db_server.id != GLOBAL_LEADERBOARD_ID
+            and (channels := targets.resolve(db_server))
+        }
+        db_servers = [
+            db_server for db_server in db_servers if db_server.id in server_channels
+        ]
+        rankings = await previous_period_rankings(list(server_channels), scores)
+
+        server_periods = [
+            (db_server, period) for db_server in db_servers for period in periods
+        ]
+        embeds = await asyncio.gather(
+            *(
+                winners_embed(period, db_server, rankings[db_server.id][period])
+                for db_server, period in server_periods
+            )
+        )
+
+        await broadcaster.broadcast(
+            delivery
+            for (db_server, _), embed in zip(server_periods, embeds)
+            for delivery in leaderboard_winners_deliveries(
+                server_channels[db_server.id], embed
+            )
+        )
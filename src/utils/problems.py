@@ -4,9 +4,11 @@ from typing import TYPE_CHECKING
 
 import bs4
 from bs4 import BeautifulSoup
+from cachetools import TTLCache
+from datadog.dogstatsd.base import statsd
 from markdownify import MarkdownConverter
 
-from src.constants import Difficulty
+from src.constants import Difficulty, RequestPriority
 from src.utils.common import convert_to_score
 
 if TYPE_CHECKING:
@@ -76,6 +78,64 @@ class UserStats:
     skills_problem_count: SkillsProblemCount
 
 
+class QuestionInfoCache(TTLCache):
+    """
+    In-process cache of parsed questions keyed by title slug.
+
+    Entries expire after `ttl` seconds, and the least recently used entry is evicted
+    once `maxsize` entries are stored.
+
+    :param maxsize: The maximum number of questions stored.
+    :param ttl: The number of seconds a question is stored for.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def lookup(self, question_title_slug: str) -> QuestionInfo | None:
+        """
+        Returns the cached question, recording whether the lookup was a hit or a miss.
+
+        :param question_title_slug: The title slug of the question.
+
+        :return: The cached question, or None if it isn't cached or has expired.
+        """
+        question_info = self.get(question_title_slug)
+
+        if question_info is None:
+            self.misses += 1
+            statsd.increment("cache.question_info.misses")
+        else:
+            self.hits += 1
+            statsd.increment("cache.question_info.hits")
+
+        return question_info
+
+    def popitem(self) -> tuple[str, QuestionInfo]:
+        # Only called when the cache is full and the least recently used entry has to
+        # make room for a new one.
+        item = super().popitem()
+        self.evictions += 1
+        statsd.increment("cache.question_info.evictions")
+        return item
+
+    def expire(self, time: float | None = None) -> list[tuple[str, QuestionInfo]]:
+        expired = super().expire(time)
+        if expired:
+            self.expirations += len(expired)
+            statsd.increment("cache.question_info.expirations", len(expired))
+        return expired
+
+
+# The daily question is requested by every server at midnight, so most lookups are
+# served from memory.
+question_info_cache = QuestionInfoCache(maxsize=512, ttl=60 * 60)
+
+
 class LeetCodeMarkdownConverter(MarkdownConverter):
     """Custom converter for LeetCode HTML content."""
 
@@ -209,6 +269,11 @@ async def fetch_random_question(
 
     :return: The title slug of a randomly selected question, or None if an error occurs.
     """
+    # Pick from the local catalogue when it's available, as it only contains
+    # non-premium candidates and needs no network round trip.
+    if title_slug := bot.catalogue.random_question(difficulty):
+        return title_slug
+
     payload = {
         "operationName": "randomQuestion",
         "query": """
@@ -277,7 +342,7 @@ async def fetch_daily_question(bot: "DiscordBot") -> str | None:
     }
 
     response_data = await bot.http_client.post_data(
-        URL, json=data, headers=HEADERS, timeout=10
+        URL, json=data, headers=HEADERS, timeout=10, coalesce=True
     )
     if not response_data:
         return
@@ -301,6 +366,9 @@ async def search_question(bot: "DiscordBot", text: str) -> str | None:
     :return: The title slug of the matched question, or None if no match is found or an
              error occurs.
     """
+    if title_slug := bot.catalogue.search(text):
+        return title_slug
+
     payload = {
         "operationName": "problemsetQuestionList",
         "query": """
@@ -362,6 +430,9 @@ async def fetch_question_info(
     :return: Information about the LeetCode question, or None if an error occurs or no
              question is found.
     """
+    if question_info := question_info_cache.lookup(question_title_slug):
+        return question_info
+
     payload = {
         "operationName": "questionInfo",
         "query": """
@@ -382,7 +453,7 @@ async def fetch_question_info(
     }
 
     response_data = await bot.http_client.post_data(
-        URL, json=payload, headers=HEADERS, timeout=10
+        URL, json=payload, headers=HEADERS, timeout=10, coalesce=True
     )
     if not response_data:
         return
@@ -416,7 +487,7 @@ async def fetch_question_info(
     # Parse content for description, example one, and follow up
     description, example_one, follow_up = parse_content(content)
 
-    return QuestionInfo(
+    question_info = QuestionInfo(
         premium=is_paid_only,
         question_id=question_id,
         difficulty=difficulty,
@@ -431,6 +502,112 @@ async def fetch_question_info(
         follow_up=follow_up,
     )
 
+    question_info_cache[question_title_slug] = question_info
+    return question_info
+
+
+# Selection set shared by the single and batched user stats queries.
+MATCHED_USER_FIELDS = """
+    profile {
+        realName
+    }
+    submitStatsGlobal {
+        acSubmissionNum {
+            difficulty
+            count
+        }
+    }
+    languageProblemCount {
+        languageName
+        problemsSolved
+    }
+    tagProblemCounts {
+        advanced {
+            tagName
+            tagSlug
+            problemsSolved
+        }
+        intermediate {
+            tagName
+            tagSlug
+            problemsSolved
+        }
+        fundamental {
+            tagName
+            tagSlug
+            problemsSolved
+        }
+    }
+"""
+
+# Number of users fetched per aliased GraphQL request.
+USER_STATS_BATCH_SIZE = 25
+
+
+def parse_matched_user(matched_user: dict) -> UserStats:
+    """
+    Parses a `matchedUser` GraphQL object into the user's statistics.
+
+    :param matched_user: The `matchedUser` object of a LeetCode GraphQL response.
+
+    :return: Statistics of problems solved and rank of the user.
+    """
+    real_name = matched_user["profile"]["realName"]
+    submit_stats_global = matched_user["submitStatsGlobal"]
+    ac_submission_num = submit_stats_global["acSubmissionNum"]
+    language_problem_count = matched_user["languageProblemCount"]
+    tag_problem_counts = matched_user["tagProblemCounts"]
+
+    language_problem_counts = [
+        LanguageProblemCount(
+            language=item["languageName"], problem_count=item["problemsSolved"]
+        )
+        for item in language_problem_count
+    ]
+    tag_problem_counts_advanced = [
+        SkillProblemCount(skill=item["tagName"], problem_count=item["problemsSolved"])
+        for item in tag_problem_counts["advanced"]
+    ]
+    tag_problem_counts_intermediate = [
+        SkillProblemCount(skill=item["tagName"], problem_count=item["problemsSolved"])
+        for item in tag_problem_counts["intermediate"]
+    ]
+    tag_problem_counts_fundamental = [
+        SkillProblemCount(skill=item["tagName"], problem_count=item["problemsSolved"])
+        for item in tag_problem_counts["fundamental"]
+    ]
+
+    easy_count = next(
+        (item["count"] for item in ac_submission_num if item["difficulty"] == "Easy"),
+        0,
+    )
+    medium_count = next(
+        (item["count"] for item in ac_submission_num if item["difficulty"] == "Medium"),
+        0,
+    )
+    hard_count = next(
+        (item["count"] for item in ac_submission_num if item["difficulty"] == "Hard"),
+        0,
+    )
+
+    return UserStats(
+        real_name=real_name,
+        submissions=Submissions(
+            easy=easy_count,
+            medium=medium_count,
+            hard=hard_count,
+            score=convert_to_score(
+                easy=easy_count, medium=medium_count, hard=hard_count
+            ),
+        ),
+        languages_problem_count=language_problem_counts,
+        skills_problem_count=SkillsProblemCount(
+            fundamental=tag_problem_counts_fundamental,
+            intermediate=tag_problem_counts_intermediate,
+            advanced=tag_problem_counts_advanced,
+        ),
+    )
+
 
 async def fetch_problems_solved_and_rank(
     bot: "DiscordBot", leetcode_id: str
@@ -445,40 +622,11 @@ async def fetch_problems_solved_and_rank(
     """
     payload = {
         "operationName": "getProblemsSolvedAndRank",
-        "query": """query getProblemsSolvedAndRank($username: String!) {
-            matchedUser(username: $username) {
-                profile {
-                    realName
-                }
-                submitStatsGlobal {
-                    acSubmissionNum {
-                        difficulty
-                        count
-                    }
-                }
-                languageProblemCount {
-                    languageName
-                    problemsSolved
-                }
-                tagProblemCounts {
-                    advanced {
-                        tagName
-                        tagSlug
-                        problemsSolved
-                    }
-                    intermediate {
-                        tagName
-                        tagSlug
-                        problemsSolved
-                    }
-                    fundamental {
-                        tagName
-                        tagSlug
-                        problemsSolved
-                    }
-                }
-            }
-        }
+        "query": f"""query getProblemsSolvedAndRank($username: String!) {{
+            matchedUser(username: $username) {{
+                {MATCHED_USER_FIELDS}
+            }}
+        }}
         """,
         "variables": {"username": leetcode_id},
     }
@@ -495,83 +643,105 @@ async def fetch_problems_solved_and_rank(
         if not matched_user:
             return
 
-        real_name = matched_user["profile"]["realName"]
-        submit_stats_global = matched_user["submitStatsGlobal"]
-        ac_submission_num = submit_stats_global["acSubmissionNum"]
-        language_problem_count = matched_user["languageProblemCount"]
-        tag_problem_counts = matched_user["tagProblemCounts"]
+        return parse_matched_user(matched_user)
 
-        language_problem_counts = [
-            LanguageProblemCount(
-                language=item["languageName"], problem_count=item["problemsSolved"]
-            )
-            for item in language_problem_count
-        ]
-        tag_problem_counts_advanced = [
-            SkillProblemCount(
-                skill=item["tagName"], problem_count=item["problemsSolved"]
-            )
-            for item in tag_problem_counts["advanced"]
-        ]
-        tag_problem_counts_intermediate = [
-            SkillProblemCount(
-                skill=item["tagName"], problem_count=item["problemsSolved"]
-            )
-            for item in tag_problem_counts["intermediate"]
-        ]
-        tag_problem_counts_fundamental = [
-            SkillProblemCount(
-                skill=item["tagName"], problem_count=item["problemsSolved"]
-            )
-            for item in tag_problem_counts["fundamental"]
-        ]
-
-        easy_count = next(
-            (
-                item["count"]
-                for item in ac_submission_num
-                if item["difficulty"] == "Easy"
-            ),
-            0,
-        )
-        medium_count = next(
-            (
-                item["count"]
-                for item in ac_submission_num
-                if item["difficulty"] == "Medium"
-            ),
-            0,
-        )
-        hard_count = next(
-            (
-                item["count"]
-                for item in ac_submission_num
-                if item["difficulty"] == "Hard"
-            ),
-            0,
-        )
-
-    except (ValueError, TypeError):
+    except (KeyError, ValueError, TypeError):
         bot.logger.exception(
             f"LeetCode JSON decoding failed | User: {leetcode_id} | "
             f"Response data: {response_data}"
         )
         return
 
-    return UserStats(
-        real_name=real_name,
-        submissions=Submissions(
-            easy=easy_count,
-            medium=medium_count,
-            hard=hard_count,
-            score=convert_to_score(
-                easy=easy_count, medium=medium_count, hard=hard_count
-            ),
-        ),
-        languages_problem_count=language_problem_counts,
-        skills_problem_count=SkillsProblemCount(
-            fundamental=tag_problem_counts_fundamental,
-            intermediate=tag_problem_counts_intermediate,
-            advanced=tag_problem_counts_advanced,
-        ),
+
+async def fetch_problems_solved_and_rank_batch(
+    bot: "DiscordBot",
+    leetcode_ids: list[str],
+    batch_size: int = USER_STATS_BATCH_SIZE,
+    priority: RequestPriority = RequestPriority.BACKGROUND,
+) -> dict[str, UserStats | None]:
+    """
+    Retrieves the statistics of problems solved and rank of many LeetCode users, using
+    GraphQL aliases to fetch up to `batch_size` users per request.
+
+    A user that doesn't exist or whose data fails to parse is mapped to None without
+    affecting the other users in the same request.
+
+    :param leetcode_ids: The LeetCode usernames.
+    :param batch_size: The maximum number of users to fetch per request.
+    :param priority: The priority the requests are sent with.
+
+    :return: Mapping from each LeetCode username to its statistics, or None if an error
+    occurs for that user.
+    """
+    # Preserve order whilst removing duplicates.
+    unique_leetcode_ids = list(dict.fromkeys(leetcode_ids))
+    user_stats: dict[str, UserStats | None] = {}
+
+    for i in range(0, len(unique_leetcode_ids), batch_size):
+        batch = unique_leetcode_ids[i : i + batch_size]
+        user_stats.update(
+            await _fetch_problems_solved_and_rank_batch(bot, batch, priority)
+        )
+
+    return user_stats
+
+
+async def _fetch_problems_solved_and_rank_batch(
+    bot: "DiscordBot", leetcode_ids: list[str], priority: RequestPriority
+) -> dict[str, UserStats | None]:
+    """
+    Retrieves the statistics of a single batch of LeetCode users in one request.
+
+    :param leetcode_ids: The LeetCode usernames in the batch.
+    :param priority: The priority the request is sent with.
+
+    :return: Mapping from each LeetCode username to its statistics, or None if an error
+    occurs for that user.
+    """
+    aliases = {f"u{i}": leetcode_id for i, leetcode_id in enumerate(leetcode_ids)}
+
+    variable_definitions = ", ".join(f"${alias}: String!" for alias in aliases)
+    selections = "\n".join(
+        f"{alias}: matchedUser(username: ${alias}) {{ {MATCHED_USER_FIELDS} }}"
+        for alias in aliases
+    )
+
+    payload = {
+        "operationName": "getProblemsSolvedAndRankBatch",
+        "query": f"""query getProblemsSolvedAndRankBatch({variable_definitions}) {{
+            {selections}
+        }}
+        """,
+        "variables": aliases,
+    }
+
+    user_stats: dict[str, UserStats | None] = dict.fromkeys(leetcode_ids)
+
+    response_data = await bot.http_client.post_data(
+        URL, json=payload, headers=HEADERS, timeout=30, priority=priority
     )
+    if not response_data or not isinstance(response_data.get("data"), dict):
+        bot.logger.error(
+            f"LeetCode batch request failed | Users: {len(leetcode_ids)} | "
+            f"Response data: {response_data}"
+        )
+        return user_stats
+
+    # Unknown usernames resolve to null and are reported under `errors`, whilst the
+    # remaining aliases are still populated.
+    data = response_data["data"]
+    for alias, leetcode_id in aliases.items():
+        matched_user = data.get(alias)
+        if not matched_user:
+            continue
+
+        try:
+            user_stats[leetcode_id] = parse_matched_user(matched_user)
+
+        except (KeyError, ValueError, TypeError):
+            bot.logger.exception(
+                f"LeetCode JSON decoding failed | User: {leetcode_id} | "
+                f"Response data: {matched_user}"
+            )
+
+    return user_stats
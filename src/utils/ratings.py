@@ -1,5 +1,7 @@
 from typing import TYPE_CHECKING
 
+from src.constants import RequestPriority
+
 if TYPE_CHECKING:
     # To prevent circular imports
     from src.bot import DiscordBot
@@ -17,7 +19,9 @@ class Ratings:
         url = """https://raw.githubusercontent.com/zerotrac/leetcode_problem_rating
         /main/ratings.txt"""
 
-        response_data = await self.bot.http_client.fetch_data(url, timeout=10)
+        response_data = await self.bot.http_client.fetch_data(
+            url, timeout=10, priority=RequestPriority.BACKGROUND
+        )
         if not response_data:
             return
 
@@ -0,0 +1,424 @@
+from datetime import UTC, datetime, timedelta
+from typing import TYPE_CHECKING
+
+from datadog.dogstatsd.base import statsd
+
+from src.constants import (
+    RECORD_COMPACTION_MIN_MONGODB_VERSION,
+    RECORD_RETENTION,
+    WEEKLY_ROLLUP_RETENTION,
+    Period,
+)
+from src.database.models import (
+    Breakdown,
+    LanguageProblemCount,
+    Record,
+    RecordRollup,
+    SkillProblemCount,
+    SkillsProblemCount,
+)
+
+if TYPE_CHECKING:
+    # To prevent circular imports
+    from src.bot import DiscordBot
+
+# The earliest possible record timestamp, to read a user's whole history.
+EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+
+SKILL_LEVELS = ("fundamental", "intermediate", "advanced")
+
+
+def as_utc(timestamp: datetime) -> datetime:
+    """
+    Make a timestamp read from MongoDB, which are returned without a timezone, UTC.
+
+    :param timestamp: The timestamp.
+
+    :return: The timezone-aware timestamp.
+    """
+    if timestamp.tzinfo is None:
+        return timestamp.replace(tzinfo=UTC)
+
+    return timestamp
+
+
+def rollup_stages(period: Period) -> list[dict]:
+    """
+    Build the aggregation stages that summarise daily records into rollups and merge
+    them into the rollups collection.
+
+    Merging keeps the earliest first record and latest last record, so rollups of a
+    period compacted over several days are combined, and repeating a compaction is
+    harmless.
+
+    :param period: The rollup period, Period.WEEK or Period.MONTH.
+
+    :return: The aggregation stages.
+    """
+    period_start = {
+        "$dateTrunc": {
+            "date": "$timestamp",
+            "unit": "week" if period == Period.WEEK else "month",
+            "startOfWeek": "monday",
+            "timezone": "UTC",
+        }
+    }
+
+    return [
+        {
+            "$group": {
+                "_id": {"user_id": "$user_id", "period_start": period_start},
+                "first_timestamp": {"$first": "$timestamp"},
+                "first_score": {"$first": "$submissions.score"},
+                "last_timestamp": {"$last": "$timestamp"},
+                "last_submissions": {"$last": "$submissions"},
+            }
+        },
+        {
+            "$project": {
+                "_id": 0,
+                "user_id": "$_id.user_id",
+                "period": period.value,
+                "period_start": "$_id.period_start",
+                "first_timestamp": 1,
+                "first_score": 1,
+                "last_timestamp": 1,
+                "last_submissions": 1,
+            }
+        },
+        {
+            "$merge": {
+                "into": RecordRollup.get_collection_name(),
+                "on": ["user_id", "period", "period_start"],
+                "whenMatched": [
+                    {
+                        "$set": {
+                            "first_timestamp": {
+                                "$min": ["$first_timestamp", "$$new.first_timestamp"]
+                            },
+                            "first_score": {
+                                "$cond": [
+                                    {
+                                        "$lt": [
+                                            "$$new.first_timestamp",
+                                            "$first_timestamp",
+                                        ]
+                                    },
+                                    "$$new.first_score",
+                                    "$first_score",
+                                ]
+                            },
+                            "last_timestamp": {
+                                "$max": ["$last_timestamp", "$$new.last_timestamp"]
+                            },
+                            "last_submissions": {
+                                "$cond": [
+                                    {
+                                        "$gt": [
+                                            "$$new.last_timestamp",
+                                            "$last_timestamp",
+                                        ]
+                                    },
+                                    "$$new.last_submissions",
+                                    "$last_submissions",
+                                ]
+                            },
+                        }
+                    }
+                ],
+                "whenNotMatched": "insert",
+            }
+        },
+    ]
+
+
+async def mongodb_version() -> tuple[int, ...]:
+    """
+    Get the version of the MongoDB server.
+
+    :return: The version's components, such as (7, 0, 2).
+    """
+    client = Record.get_motor_collection().database.client
+    server_info = await client.server_info()
+    return tuple(server_info["versionArray"][:3])
+
+
+async def compact_records(bot: "DiscordBot") -> None:
+    """
+    Compact the daily records older than the retention window into weekly and monthly
+    rollups, then delete them, along with weekly rollups older than their retention.
+
+    Skipped on MongoDB servers that can't delete the compacted records, as the same
+    records would otherwise be rolled up again on every run.
+    """
+    version = await mongodb_version()
+    if version < RECORD_COMPACTION_MIN_MONGODB_VERSION:
+        bot.logger.error(
+            "Record compaction skipped | MongoDB version unsupported | "
+            f"Version: {'.'.join(map(str, version))}"
+        )
+        return
+
+    today = datetime.now(UTC).replace(hour=0, minute=0, second=0, microsecond=0)
+    cutoff = today - RECORD_RETENTION
+    # Compact whole weeks only, so the retained records start at a breakdown keyframe.
+    cutoff -= timedelta(days=cutoff.weekday())
+
+    old_records = Record.find(Record.timestamp < cutoff)
+    record_count = await old_records.count()
+
+    if record_count:
+        for period in (Period.WEEK, Period.MONTH):
+            await Record.aggregate(
+                [
+                    {"$match": {"timestamp": {"$lt": cutoff}}},
+                    {"$sort": {"user_id": 1, "timestamp": 1}},
+                    *rollup_stages(period),
+                ],
+                allowDiskUse=True,
+            ).to_list()
+
+        # Only deleted once both rollups are written, so a failed compaction is
+        # retried in full on the next run.
+        await old_records.delete()
+
+    delete_result = await RecordRollup.find(
+        RecordRollup.period == Period.WEEK,
+        RecordRollup.period_start < today - WEEKLY_ROLLUP_RETENTION,
+    ).delete()
+    deleted_rollups = delete_result.deleted_count if delete_result else 0
+
+    bot.logger.info(
+        f"Record compaction completed | Records compacted: {record_count} | "
+        f"Weekly rollups deleted: {deleted_rollups}"
+    )
+    statsd.increment("db.records.compacted", record_count)
+
+
+async def record_scores(
+    user_id: int, start: datetime, end: datetime | None = None
+) -> list[tuple[datetime, int]]:
+    """
+    Read the scores of a user's history within a time range, from whichever tier
+    covers it.
+
+    Daily records are used where they are retained. Before that, each weekly rollup
+    contributes the first and last record of its week, and before the weekly rollups,
+    each monthly rollup contributes the first and last record of its month.
+
+    :param user_id: The user's id.
+    :param start: The start of the range, inclusive.
+    :param end: The end of the range, exclusive, or None for no end.
+
+    :return: The timestamps and scores, in chronological order.
+    """
+    timestamp_range: dict = {"$gte": start}
+    if end:
+        timestamp_range["$lt"] = end
+
+    scores = [
+        (as_utc(row["timestamp"]), row["score"])
+        async for row in Record.aggregate(
+            [
+                {"$match": {"user_id": user_id, "timestamp": timestamp_range}},
+                {"$sort": {"timestamp": 1}},
+                {"$project": {"_id": 0, "timestamp": 1, "score": "$submissions.score"}},
+            ]
+        )
+    ]
+
+    for period in (Period.WEEK, Period.MONTH):
+        # Rollups only fill in history before the finer grained tier.
+        covered_from = scores[0][0] if scores else end
+
+        rollup_scores: list[tuple[datetime, int]] = []
+        async for db_rollup in RecordRollup.find(
+            RecordRollup.user_id == user_id,
+            RecordRollup.period == period,
+            RecordRollup.last_timestamp >= start,
+        ).sort(
+            +RecordRollup.period_start  # type: ignore
+        ):
+            for timestamp, score in (
+                (db_rollup.first_timestamp, db_rollup.first_score),
+                (db_rollup.last_timestamp, db_rollup.last_submissions.score),
+            ):
+                timestamp = as_utc(timestamp)
+                if timestamp >= start and (
+                    not covered_from or timestamp < covered_from
+                ):
+                    rollup_scores.append((timestamp, score))
+
+        # The first and last record are the same when a period has a single record.
+        scores = sorted(set(rollup_scores)) + scores
+
+    return scores
+
+
+def is_keyframe_day(timestamp: datetime) -> bool:
+    """
+    Whether a record on a given day holds the full breakdowns. Keyframes are written
+    weekly, at the same boundary records are compacted on.
+
+    :param timestamp: The record's timestamp.
+    """
+    return timestamp.weekday() == 0
+
+
+def breakdown_counts(
+    breakdown: Breakdown,
+) -> tuple[dict[str, int], dict[str, dict[str, int]]]:
+    """
+    Index a breakdown's counts by name.
+
+    :param breakdown: The breakdown.
+
+    :return: The language counts, and the skill counts of each skill level.
+    """
+    languages = {x.language: x.count for x in breakdown.languages_problem_count}
+    skills = {
+        level: {
+            x.skill: x.count for x in getattr(breakdown.skills_problem_count, level)
+        }
+        for level in SKILL_LEVELS
+    }
+
+    return languages, skills
+
+
+def breakdown_from_counts(
+    languages: dict[str, int], skills: dict[str, dict[str, int]]
+) -> Breakdown:
+    """
+    Build a breakdown from counts indexed by name.
+
+    :param languages: The language counts.
+    :param skills: The skill counts of each skill level.
+
+    :return: The breakdown.
+    """
+    return Breakdown(
+        languages_problem_count=[
+            LanguageProblemCount(language=language, count=count)
+            for language, count in languages.items()
+        ],
+        skills_problem_count=SkillsProblemCount(
+            **{
+                level: [
+                    SkillProblemCount(skill=skill, count=count)
+                    for skill, count in skills[level].items()
+                ]
+                for level in SKILL_LEVELS
+            }
+        ),
+    )
+
+
+def breakdown_delta(previous: Breakdown, current: Breakdown) -> Breakdown:
+    """
+    Find the breakdown entries that changed between two full breakdowns.
+
+    :param previous: The previous full breakdown.
+    :param current: The current full breakdown.
+
+    :return: The new and changed entries, and removed entries with a count of 0.
+    """
+
+    def changed_counts(
+        previous_counts: dict[str, int], current_counts: dict[str, int]
+    ) -> dict[str, int]:
+        changed = {
+            name: count
+            for name, count in current_counts.items()
+            if previous_counts.get(name) != count
+        }
+        changed.update(
+            {name: 0 for name in previous_counts if name not in current_counts}
+        )
+        return changed
+
+    previous_languages, previous_skills = breakdown_counts(previous)
+    current_languages, current_skills = breakdown_counts(current)
+
+    return breakdown_from_counts(
+        changed_counts(previous_languages, current_languages),
+        {
+            level: changed_counts(previous_skills[level], current_skills[level])
+            for level in SKILL_LEVELS
+        },
+    )
+
+
+def apply_breakdown_delta(base: Breakdown, delta: Breakdown) -> Breakdown:
+    """
+    Apply the changed entries of a record to a full breakdown.
+
+    :param base: The full breakdown of the previous record.
+    :param delta: The changed entries.
+
+    :return: The full breakdown.
+    """
+
+    def apply_counts(
+        base_counts: dict[str, int], delta_counts: dict[str, int]
+    ) -> dict[str, int]:
+        counts = base_counts | delta_counts
+        return {name: count for name, count in counts.items() if count != 0}
+
+    base_languages, base_skills = breakdown_counts(base)
+    delta_languages, delta_skills = breakdown_counts(delta)
+
+    return breakdown_from_counts(
+        apply_counts(base_languages, delta_languages),
+        {
+            level: apply_counts(base_skills[level], delta_skills[level])
+            for level in SKILL_LEVELS
+        },
+    )
+
+
+async def record_breakdown(user_id: int, timestamp: datetime) -> Breakdown | None:
+    """
+    Reconstruct a user's full breakdown as of a given time, from the latest keyframe
+    and the changes recorded after it.
+
+    :param user_id: The user's id.
+    :param timestamp: The time to reconstruct the breakdown at.
+
+    :return: The full breakdown, or None if there's no keyframe before the time.
+    """
+    # Records written before breakdowns were delta encoded are all keyframes, but
+    # don't have the field.
+    db_keyframe = (
+        await Record.find(
+            Record.user_id == user_id,
+            Record.keyframe != False,  # noqa: E712
+            Record.timestamp <= timestamp,
+        )
+        .sort(-Record.timestamp)  # type: ignore
+        .first_or_none()
+    )
+    if not db_keyframe:
+        return None
+
+    breakdown = Breakdown(
+        languages_problem_count=db_keyframe.languages_problem_count,
+        skills_problem_count=db_keyframe.skills_problem_count,
+    )
+
+    async for db_record in Record.find(
+        Record.user_id == user_id,
+        Record.timestamp > db_keyframe.timestamp,
+        Record.timestamp <= timestamp,
+    ).sort(
+        +Record.timestamp  # type: ignore
+    ):
+        breakdown = apply_breakdown_delta(
+            breakdown,
+            Breakdown(
+                languages_problem_count=db_record.languages_problem_count,
+                skills_problem_count=db_record.skills_problem_count,
+            ),
+        )
+
+    return breakdown
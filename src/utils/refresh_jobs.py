@@ -0,0 +1,178 @@
+from datetime import UTC, datetime
+from typing import AsyncIterator
+
+from beanie.odm.operators.update.array import AddToSet
+from beanie.odm.operators.update.general import Set
+from beanie.odm.queries.find import FindMany
+from datadog.dogstatsd.base import statsd
+
+from src.constants import REFRESH_JOB_RETENTION, Period, RefreshPhase
+from src.database.models import RefreshJob, Server
+from src.utils.leaderboards import current_period_start
+from src.utils.records import as_utc
+
+# Number of servers notified concurrently between checkpoints.
+SERVER_CHUNK_SIZE = 200
+
+RESET_FIELDS = {
+    Period.DAY: "reset_day",
+    Period.WEEK: "reset_week",
+    Period.MONTH: "reset_month",
+}
+
+
+def phase_completed(job: RefreshJob, phase: RefreshPhase) -> bool:
+    """
+    Whether a phase of a refresh job has completed.
+
+    :param job: The refresh job.
+    :param phase: The phase.
+    """
+    return phase in job.completed_phases
+
+
+async def complete_phase(job: RefreshJob, phase: RefreshPhase) -> None:
+    """
+    Mark a phase of a refresh job as completed, clearing the checkpoints for the next
+    phase.
+
+    :param job: The refresh job.
+    :param phase: The completed phase.
+    """
+    job.completed_phases.append(phase)
+    job.last_user_id = None
+    job.last_server_id = None
+
+    await RefreshJob.find_one(RefreshJob.id == job.id).update(
+        AddToSet({RefreshJob.completed_phases: phase.value}),
+        Set({RefreshJob.last_user_id: None, RefreshJob.last_server_id: None}),
+    )  # type: ignore
+
+
+async def save_user_checkpoint(job: RefreshJob, last_user_id: int) -> None:
+    """
+    Record that every user up to and including an id has been refreshed.
+
+    :param job: The refresh job.
+    :param last_user_id: The id of the last refreshed user.
+    """
+    job.last_user_id = last_user_id
+
+    await RefreshJob.find_one(RefreshJob.id == job.id).update(
+        Set({RefreshJob.last_user_id: last_user_id})
+    )  # type: ignore
+
+
+async def checkpointed_servers(
+    job: RefreshJob, chunk_size: int = SERVER_CHUNK_SIZE
+) -> AsyncIterator[list[Server]]:
+    """
+    Iterate over the servers in ascending id order, in chunks, starting after the job's
+    server checkpoint, and move the checkpoint past each chunk once it has been
+    processed.
+
+    :param job: The refresh job.
+    :param chunk_size: The number of servers per chunk.
+
+    :return: The chunks of servers not yet processed in the current phase, with links
+    fetched.
+    """
+    query = (
+        Server.find(Server.id > job.last_server_id, fetch_links=True)
+        if job.last_server_id is not None
+        else Server.find_all(fetch_links=True)
+    )
+
+    db_servers: list[Server] = []
+    async for db_server in query.sort(+Server.id):  # type: ignore
+        db_servers.append(db_server)
+        if len(db_servers) < chunk_size:
+            continue
+
+        yield db_servers
+        await save_server_checkpoint(job, db_servers[-1].id)
+        db_servers = []
+
+    if db_servers:
+        yield db_servers
+        await save_server_checkpoint(job, db_servers[-1].id)
+
+
+async def save_server_checkpoint(job: RefreshJob, last_server_id: int) -> None:
+    """
+    Record that every server up to and including an id has been processed.
+
+    :param job: The refresh job.
+    :param last_server_id: The id of the last processed server.
+    """
+    job.last_server_id = last_server_id
+
+    await RefreshJob.find_one(RefreshJob.id == job.id).update(
+        Set({RefreshJob.last_server_id: last_server_id})
+    )  # type: ignore
+
+
+async def finish_refresh_job(job: RefreshJob) -> None:
+    """
+    Mark a refresh job as finished, and delete the finished jobs older than the
+    retention.
+
+    :param job: The refresh job.
+    """
+    job.finished_at = datetime.now(UTC)
+    await RefreshJob.find_one(RefreshJob.id == job.id).update(
+        Set({RefreshJob.finished_at: job.finished_at})
+    )  # type: ignore
+
+    await RefreshJob.find(
+        RefreshJob.finished_at < job.finished_at - REFRESH_JOB_RETENTION
+    ).delete()
+
+    statsd.timing(
+        "stats.refresh.job.duration",
+        (job.finished_at - as_utc(job.started_at)).total_seconds(),
+    )
+
+
+def unfinished_refresh_jobs(started_before: datetime) -> FindMany[RefreshJob]:
+    """
+    Find the refresh jobs that were interrupted before finishing.
+
+    :param started_before: Only jobs started before this time are found, so that jobs
+    still running in the current process are excluded.
+
+    :return: The query of unfinished jobs, oldest first.
+    """
+    return RefreshJob.find(
+        RefreshJob.finished_at == None,  # noqa: E711
+        RefreshJob.started_at < started_before,
+    ).sort(
+        +RefreshJob.started_at  # type: ignore
+    )
+
+
+async def missed_resets() -> dict[Period, bool]:
+    """
+    Find the period resets that haven't run since their period started, such as when
+    the bot was offline at midnight.
+
+    A reset is only considered missed if it has run before, so that a fresh database
+    doesn't reset at an arbitrary time.
+
+    :return: Whether each resetting period's reset was missed.
+    """
+    missed: dict[Period, bool] = {}
+
+    for period, field in RESET_FIELDS.items():
+        db_job = (
+            await RefreshJob.find({field: True})
+            .sort(-RefreshJob.started_at)  # type: ignore
+            .first_or_none()
+        )
+        period_start = current_period_start(period)
+
+        missed[period] = bool(
+            db_job and period_start and as_utc(db_job.started_at) < period_start
+        )
+
+    return missed
@@ -1,16 +1,33 @@
-from typing import Any
+import asyncio
+from typing import TYPE_CHECKING, Any
 
 import discord
 from datadog.dogstatsd.base import statsd
 from discord import Role
+from pymongo import UpdateOne
 
 from src.constants import (
+    GLOBAL_LEADERBOARD_ID,
     MILESTONE_ROLES,
     STREAK_ROLES,
     VERIFIED_ROLE,
     CodeGrindTierInfo,
 )
-from src.database.models import Profile, User
+from src.database.models import AppliedRoles, Profile, User
+
+if TYPE_CHECKING:
+    # To prevent circular imports
+    from src.bot import DiscordBot
+
+# Maximum number of servers whose roles are updated concurrently.
+ROLE_UPDATE_CONCURRENCY = 8
+
+# Names of the roles the bot assigns, which are replaced when updating a member's roles.
+MANAGED_ROLE_NAMES = {
+    VERIFIED_ROLE,
+    *(tier_info.role_name for tier_info in MILESTONE_ROLES.values()),
+    *(tier_info.role_name for tier_info in STREAK_ROLES.values()),
+}
 
 
 def get_highest_tier_info(
@@ -128,33 +145,259 @@ async def remove_roles(guild: discord.Guild) -> None:
     await remove_roles_from_dict(guild, STREAK_ROLES)
 
 
-async def update_roles(guild: discord.Guild, server_id: int) -> None:
+async def update_all_roles(bot: "DiscordBot") -> int:
+    """
+    Update the roles of the members whose tiers changed since their roles were last
+    updated, in every server that has the verified role, updating several servers
+    concurrently.
+
+    Role edits are rate limited per server, so servers are updated concurrently whilst
+    the members of each server are updated one at a time.
+
+    :return: The number of servers whose roles were updated.
+    """
+    semaphore = asyncio.Semaphore(ROLE_UPDATE_CONCURRENCY)
+    updated_server_count = 0
+
+    async def update_server_roles(guild: discord.Guild, user_ids: list[int]) -> None:
+        nonlocal updated_server_count
+
+        async with semaphore:
+            try:
+                await update_roles(guild, guild.id, user_ids)
+                updated_server_count += 1
+            except discord.errors.Forbidden:
+                bot.logger.warning(f"Role update forbidden | Server ID: {guild.id}")
+
+    server_user_ids = await tier_changed_members()
+    statsd.gauge(
+        "discord.bot.roles.members.changed",
+        sum(len(user_ids) for user_ids in server_user_ids.values()),
+    )
+
+    guilds = []
+    for server_id in server_user_ids:
+        # Only update roles for servers that have the VERIFIED_ROLE.
+        if (guild := bot.get_guild(server_id)) and discord.utils.get(
+            guild.roles, name=VERIFIED_ROLE
+        ):
+            guilds.append(guild)
+
+    await asyncio.gather(
+        *(update_server_roles(guild, server_user_ids[guild.id]) for guild in guilds)
+    )
+
+    return updated_server_count
+
+
+def tier_expression(tier_group: dict[Any, CodeGrindTierInfo], value: str) -> dict:
+    """
+    Build an aggregation expression that finds the highest tier reached, following the
+    same rules as `get_highest_tier_info`.
+
+    :param tier_group: The tier group.
+    :param value: The field path of the user's value.
+
+    :return: The expression, evaluating to the tier's threshold, or 0 if no tier was
+    reached.
+    """
+    thresholds = sorted(
+        (tier_info.threshold for tier_info in tier_group.values()), reverse=True
+    )
+
+    return {
+        "$switch": {
+            "branches": [
+                {"case": {"$gte": [value, threshold]}, "then": threshold}
+                for threshold in thresholds
+            ],
+            "default": 0,
+        }
+    }
+
+
+def tier_threshold(tier_group: dict[Any, CodeGrindTierInfo], value: int) -> int:
+    """
+    Find the threshold of the highest tier reached.
+
+    :param tier_group: The tier group.
+    :param value: The user's value.
+
+    :return: The tier's threshold, or 0 if no tier was reached.
+    """
+    highest_tier_info = get_highest_tier_info(tier_group, value)
+    return highest_tier_info.threshold if highest_tier_info else 0
+
+
+async def tier_changed_members() -> dict[int, list[int]]:
+    """
+    Find the members whose milestone or streak tier differs from the tiers of the roles
+    they were last given, including members whose roles were never updated, in a
+    single aggregation.
+
+    :return: The ids of the members, keyed by server id.
+    """
+    pipeline = [
+        {"$match": {"server_id": {"$ne": GLOBAL_LEADERBOARD_ID}}},
+        {
+            "$lookup": {
+                "from": User.get_collection_name(),
+                "localField": "user_id",
+                "foreignField": "_id",
+                "pipeline": [
+                    {
+                        "$project": {
+                            "_id": 0,
+                            "score": "$stats.submissions.score",
+                            "streak": "$stats.streak",
+                        }
+                    }
+                ],
+                "as": "user",
+            }
+        },
+        {"$unwind": "$user"},
+        {
+            "$match": {
+                "$or": [
+                    {"applied_roles": None},
+                    {
+                        "$expr": {
+                            "$or": [
+                                {
+                                    "$ne": [
+                                        tier_expression(MILESTONE_ROLES, "$user.score"),
+                                        "$applied_roles.milestone_tier",
+                                    ]
+                                },
+                                {
+                                    "$ne": [
+                                        tier_expression(STREAK_ROLES, "$user.streak"),
+                                        "$applied_roles.streak_tier",
+                                    ]
+                                },
+                            ]
+                        }
+                    },
+                ]
+            }
+        },
+        {"$project": {"_id": 0, "server_id": 1, "user_id": 1}},
+    ]
+
+    server_user_ids: dict[int, list[int]] = {}
+    async for row in Profile.aggregate(pipeline):
+        server_user_ids.setdefault(row["server_id"], []).append(row["user_id"])
+
+    return server_user_ids
+
+
+def desired_roles(
+    member: discord.Member, guild_roles: dict[str, Role], applied_roles: AppliedRoles
+) -> list[Role]:
+    """
+    Compute the roles a member should have: their roles that aren't managed by the bot,
+    the verified role, and the role of each tier they've reached.
+
+    :param member: The member.
+    :param guild_roles: The guild's roles, keyed by name.
+    :param applied_roles: The tiers the member has reached.
+
+    :return: The member's roles, excluding the default role.
+    """
+    roles = [
+        role
+        for role in member.roles
+        if not role.is_default() and role.name not in MANAGED_ROLE_NAMES
+    ]
+
+    role_names = [VERIFIED_ROLE]
+    for tier_group, threshold in (
+        (STREAK_ROLES, applied_roles.streak_tier),
+        (MILESTONE_ROLES, applied_roles.milestone_tier),
+    ):
+        for tier_info in tier_group.values():
+            if tier_info.threshold == threshold:
+                role_names.append(tier_info.role_name)
+
+    roles.extend(guild_roles[name] for name in role_names if name in guild_roles)
+    return roles
+
+
+async def update_roles(
+    guild: discord.Guild, server_id: int, user_ids: list[int] | None = None
+) -> None:
     """
     Update roles for users in the server based on their stats.
 
+    The users are loaded in a single query, and each member's roles are replaced in a
+    single edit, only if they differ from the roles the member should have. The tiers
+    given to each member are stored on their profile, to find the members whose tiers
+    change.
+
     :param guild: The guild in which to update the roles.
     :param server_id: The id of the server to update its roles.
+    :param user_ids: The ids of the users to update, or None for every user in the
+    server.
     """
     if not guild.me.guild_permissions.manage_roles:
         return
 
-    async for profile in Profile.find_many(Profile.server_id == server_id):
-        db_user = await User.find_one(User.id == profile.user_id)
-
-        if not db_user:
-            # This shouldn't happen
-            continue
-
-        member = guild.get_member(db_user.id)
-
-        if not member:
-            continue
-
-        await give_verified_role(guild, member)
-        await give_tier_group_role(guild, member, STREAK_ROLES, db_user.stats.streak)
-        await give_tier_group_role(
-            guild, member, MILESTONE_ROLES, db_user.stats.submissions.score
-        )
+    guild_roles = {role.name: role for role in guild.roles}
+    if user_ids is None:
+        user_ids = await Profile.distinct("user_id", {"server_id": server_id})
+
+    # {user_id: AppliedRoles}
+    applied: dict[int, AppliedRoles] = {}
+
+    try:
+        async for row in User.aggregate(
+            [
+                {"$match": {"_id": {"$in": user_ids}}},
+                {
+                    "$project": {
+                        "streak": "$stats.streak",
+                        "score": "$stats.submissions.score",
+                    }
+                },
+            ]
+        ):
+            member = guild.get_member(row["_id"])
+
+            if not member:
+                continue
+
+            applied_roles = AppliedRoles(
+                milestone_tier=tier_threshold(MILESTONE_ROLES, row.get("score") or 0),
+                streak_tier=tier_threshold(STREAK_ROLES, row.get("streak") or 0),
+            )
+            current_roles = {role for role in member.roles if not role.is_default()}
+            roles = desired_roles(member, guild_roles, applied_roles)
+
+            if set(roles) != current_roles:
+                await member.edit(roles=roles)
+                statsd.increment(
+                    "discord.bot.roles.added", len(set(roles) - current_roles)
+                )
+                statsd.increment(
+                    "discord.bot.roles.removed", len(current_roles - set(roles))
+                )
+
+            applied[member.id] = applied_roles
+
+    finally:
+        # The members updated before a failure don't need updating again.
+        if applied:
+            await Profile.get_motor_collection().bulk_write(
+                [
+                    UpdateOne(
+                        {"server_id": server_id, "user_id": user_id},
+                        {"$set": {"applied_roles": applied_roles.model_dump()}},
+                    )
+                    for user_id, applied_roles in applied.items()
+                ],
+                ordered=False,
+            )
 
 
 async def give_verified_role(guild: discord.Guild, member: discord.Member) -> None:
@@ -172,36 +415,3 @@ async def give_verified_role(guild: discord.Guild, member: discord.Member) -> No
 
     await member.add_roles(role)
     statsd.increment("discord.bot.roles.added")
-
-
-async def give_tier_group_role(
-    guild: discord.Guild,
-    member: discord.Member,
-    tier_group: dict[Any, CodeGrindTierInfo],
-    user_value: int,
-) -> None:
-    """
-    Give a tier group role to a user based on their value (e.g. points or streak).
-
-    :param guild: The guild in which to give the role.
-    :param member: The member to whom to give the role.
-    :param tier_group: The tier group to assign roles from.
-    :param user_value: The user's value.
-    """
-    role_to_assign: Role | None = None
-    if highest_tier_info := get_highest_tier_info(MILESTONE_ROLES, user_value):
-        role_to_assign = discord.utils.get(
-            guild.roles, name=highest_tier_info.role_name
-        )
-
-    # Remove all other roles.
-    for codegrind_tier in tier_group.values():
-        role = discord.utils.get(guild.roles, name=codegrind_tier.role_name)
-        if role and role in member.roles and role != role_to_assign:
-            await member.remove_roles(role)
-            statsd.increment("discord.bot.roles.removed")
-
-    if role_to_assign:
-        # Give the member the appropriate role.
-        await member.add_roles(role_to_assign)
-        statsd.increment("discord.bot.roles.added")
@@ -6,7 +6,11 @@ from datadog.dogstatsd.base import DogStatsd, statsd
 from discord.ext import tasks
 
 from src.utils.dev import prune_members_and_guilds
-from src.utils.notifications import process_daily_question_and_stats_update
+from src.utils.notifications import (
+    process_daily_question_and_stats_update,
+    resume_refresh_jobs,
+)
+from src.utils.records import compact_records
 
 if TYPE_CHECKING:
     # To prevent circular imports
@@ -56,6 +60,16 @@ async def schedule_question_and_stats_update(bot: "DiscordBot") -> None:
     await process_daily_question_and_stats_update(bot)
 
 
+@tasks.loop(count=1, reconnect=False)
+@task_exception_handler
+async def schedule_resume_refresh_jobs(bot: "DiscordBot") -> None:
+    """
+    Resume the refresh jobs interrupted by a restart, once the bot is ready.
+    """
+    await bot.wait_until_ready()
+    await resume_refresh_jobs(bot)
+
+
 @tasks.loop(hours=168, reconnect=False)
 @task_exception_handler
 async def schedule_prune_members_and_guilds(bot: "DiscordBot") -> None:
@@ -93,6 +107,24 @@ async def schedule_update_neetcode_solutions(bot: "DiscordBot") -> None:
     await bot.neetcode.update_solutions()
 
 
+@tasks.loop(hours=24, reconnect=False)
+@task_exception_handler
+async def schedule_update_problem_catalogue(bot: "DiscordBot") -> None:
+    """
+    Update the local problem catalogue daily.
+    """
+    await bot.catalogue.update_catalogue()
+
+
+@tasks.loop(hours=24, reconnect=False)
+@task_exception_handler
+async def schedule_compact_records(bot: "DiscordBot") -> None:
+    """
+    Compact records older than the retention window into rollups daily.
+    """
+    await compact_records(bot)
+
+
 @tasks.loop(seconds=30, reconnect=False)
 @task_exception_handler
 async def schedule_ok_service_check(bot: "DiscordBot") -> None:
@@ -109,8 +141,11 @@ async def schedule_ok_service_check(bot: "DiscordBot") -> None:
 
 TASKS_TO_SCHEDULE = [
     schedule_question_and_stats_update,
+    schedule_resume_refresh_jobs,
     schedule_prune_members_and_guilds,
     schedule_update_zerotrac_ratings,
     schedule_update_neetcode_solutions,
+    schedule_update_problem_catalogue,
+    schedule_compact_records,
     schedule_ok_service_check,
 ]
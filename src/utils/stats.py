@@ -1,127 +1,431 @@
 import asyncio
 import io
 import uuid
-from datetime import UTC, datetime
+from datetime import UTC, datetime, timedelta
 from typing import TYPE_CHECKING
 
 import discord
-from beanie.odm.operators.update.general import Inc, Set
-from beanie.operators import In
+from beanie.odm.queries.find import FindMany
+from beanie.operators import And, Or
+from datadog.dogstatsd.base import statsd
 from PIL import Image, UnidentifiedImageError
 from playwright.async_api import Error as PlaywrightError
 from playwright.async_api import FloatRect
+from pydantic import ValidationError
+from pymongo import UpdateOne
 
-from src.constants import Period, StatsCardExtensions
+from src.constants import REFRESH_TIERS, Period, RefreshPhase, StatsCardExtensions
 from src.database.models import (
+    Breakdown,
     LanguageProblemCount,
+    LeaderboardSnapshot,
     Profile,
     Record,
-    Server,
+    RefreshJob,
     SkillProblemCount,
     SkillsProblemCount,
     Submissions,
     User,
 )
-from src.utils.leaderboards import all_users_scores_and_wins
-from src.utils.problems import fetch_problems_solved_and_rank
+from src.utils.leaderboard_snapshots import invalidate_period_leaderboard_snapshots
+from src.utils.leaderboards import (
+    advance_period_scores,
+    load_period_scores,
+    previous_period_scores,
+    rebuild_leaderboard_snapshots,
+)
+from src.utils.problems import (
+    USER_STATS_BATCH_SIZE,
+    UserStats,
+    fetch_problems_solved_and_rank_batch,
+)
+from src.utils.records import (
+    EPOCH,
+    breakdown_delta,
+    is_keyframe_day,
+    record_scores,
+)
+from src.utils.refresh_jobs import (
+    complete_phase,
+    phase_completed,
+    save_user_checkpoint,
+)
+from src.utils.stats_writer import StatsWriter
 
 if TYPE_CHECKING:
     # To prevent circular imports
     from src.bot import DiscordBot
 
-stats_update_semaphore = asyncio.Semaphore(4)
+# Number of batches of users fetched concurrently during a stats refresh.
+STATS_REFRESH_WORKERS = 4
+# Maximum number of batches read ahead of the workers.
+STATS_REFRESH_QUEUE_SIZE = 8
+# Number of batches between saved checkpoints of a refresh job.
+STATS_CHECKPOINT_INTERVAL = 10
+
+# Refreshes run every 30 minutes but take a while to complete, so users whose refresh
+# is almost due are included rather than delayed by a whole cycle.
+REFRESH_DUE_SLACK = timedelta(minutes=10)
 
 
-async def update_stats(
+async def update_stats_batch(
     bot: "DiscordBot",
-    db_user: User,
+    db_users: list[User],
+    writer: StatsWriter,
     reset_day: bool = False,
+    batch_size: int = USER_STATS_BATCH_SIZE,
 ) -> None:
     """
-    Update a user's problem-solving statistics and optionally store them as a record.
+    Update the problem-solving statistics of many users, fetching them in batched
+    requests.
 
-    This function fetches updated statistics for a user, assigns the new values to the
-    user's submission statistics, and optionally creates a record with the updated
+    Users whose statistics could not be fetched are left untouched.
+
+    :param db_users: The users whose stats are being updated.
+    :param writer: The writer the updated stats and records are queued in.
+    :param reset_day: If `True`, a new record is created and stored with the updated
     stats.
+    :param batch_size: The maximum number of users to fetch per request.
+    """
+    user_stats = await fetch_problems_solved_and_rank_batch(
+        bot, [db_user.leetcode_id for db_user in db_users], batch_size
+    )
+
+    for db_user in db_users:
+        stats = user_stats.get(db_user.leetcode_id)
+        if not stats:
+            continue
+
+        await apply_stats(db_user, stats, writer, reset_day)
+
+
+async def apply_stats(
+    db_user: User, stats: UserStats, writer: StatsWriter, reset_day: bool = False
+) -> None:
+    """
+    Assign fetched statistics to a user and optionally store them as a record.
+
+    The updated user and record are queued in the writer rather than saved directly.
 
     :param db_user: The user whose stats are being updated.
+    :param stats: The user's fetched statistics.
+    :param writer: The writer the updated stats and record are queued in.
     :param reset_day: If `True`, a new record is created and stored with the updated
     stats.
     """
+    now = datetime.now(UTC)
+
+    if stats.submissions.score != db_user.stats.submissions.score:
+        db_user.score_last_changed = now
+        writer.score_changed_user_ids.add(db_user.id)
+    elif db_user.score_last_changed is None:
+        db_user.score_last_changed = await score_last_changed_from_records(db_user)
+
+    (
+        db_user.stats.submissions.easy,
+        db_user.stats.submissions.medium,
+        db_user.stats.submissions.hard,
+        db_user.stats.submissions.score,
+    ) = (
+        stats.submissions.easy,
+        stats.submissions.medium,
+        stats.submissions.hard,
+        stats.submissions.score,
+    )
 
-    async with stats_update_semaphore:
-        stats = await fetch_problems_solved_and_rank(bot, db_user.leetcode_id)
-        if not stats:
-            return
+    if reset_day:
+        try:
+            record = stats_record(db_user, stats)
+        except ValidationError:
+            writer.bot.logger.exception(
+                f"Record validation failed | User ID: {db_user.id}"
+            )
+        else:
+            encode_record_breakdown(db_user, record)
+            await writer.add_record(record)
+            db_user.period_scores = await advance_period_scores(db_user, record)
+    elif db_user.period_scores is None:
+        # Users added before period scores were tracked, whose period scores on the
+        # leaderboards change from 0.
+        db_user.period_scores = await load_period_scores(
+            db_user, now.replace(hour=0, minute=0, second=0, microsecond=0)
+        )
+        writer.score_changed_user_ids.add(db_user.id)
+
+    db_user.last_updated = now
+    await writer.add_user(db_user)
+
+
+def stats_record(db_user: User, stats: UserStats) -> Record:
+    """
+    Create today's record of a user's fetched statistics.
 
-        (
-            db_user.stats.submissions.easy,
-            db_user.stats.submissions.medium,
-            db_user.stats.submissions.hard,
-            db_user.stats.submissions.score,
-        ) = (
-            stats.submissions.easy,
-            stats.submissions.medium,
-            stats.submissions.hard,
-            stats.submissions.score,
+    :param db_user: The user the record belongs to.
+    :param stats: The user's fetched statistics.
+
+    :return: The record.
+    """
+    languages_problem_count = list(
+        map(
+            lambda x: LanguageProblemCount(language=x.language, count=x.problem_count),
+            stats.languages_problem_count,
         )
+    )
 
-        if reset_day:
-            languages_problem_count = list(
-                map(
-                    lambda x: LanguageProblemCount(
-                        language=x.language, count=x.problem_count
-                    ),
-                    stats.languages_problem_count,
-                )
+    skills_problem_count = SkillsProblemCount(
+        fundamental=list(
+            map(
+                lambda x: SkillProblemCount(skill=x.skill, count=x.problem_count),
+                stats.skills_problem_count.fundamental,
             )
-
-            skills_problem_count = SkillsProblemCount(
-                fundamental=list(
-                    map(
-                        lambda x: SkillProblemCount(
-                            skill=x.skill, count=x.problem_count
-                        ),
-                        stats.skills_problem_count.fundamental,
-                    )
-                ),
-                intermediate=list(
-                    map(
-                        lambda x: SkillProblemCount(
-                            skill=x.skill, count=x.problem_count
-                        ),
-                        stats.skills_problem_count.intermediate,
-                    )
-                ),
-                advanced=list(
-                    map(
-                        lambda x: SkillProblemCount(
-                            skill=x.skill, count=x.problem_count
-                        ),
-                        stats.skills_problem_count.advanced,
-                    )
-                ),
+        ),
+        intermediate=list(
+            map(
+                lambda x: SkillProblemCount(skill=x.skill, count=x.problem_count),
+                stats.skills_problem_count.intermediate,
             )
+        ),
+        advanced=list(
+            map(
+                lambda x: SkillProblemCount(skill=x.skill, count=x.problem_count),
+                stats.skills_problem_count.advanced,
+            )
+        ),
+    )
+
+    record = Record(
+        timestamp=datetime.now(UTC).replace(hour=0, minute=0, second=0, microsecond=0),
+        user_id=db_user.id,
+        submissions=Submissions(
+            easy=stats.submissions.easy,
+            medium=stats.submissions.medium,
+            hard=stats.submissions.hard,
+            score=stats.submissions.score,
+        ),
+        languages_problem_count=languages_problem_count,
+        skills_problem_count=skills_problem_count,
+    )
 
-            record = Record(
-                timestamp=datetime.now(UTC).replace(
-                    hour=0, minute=0, second=0, microsecond=0
-                ),
-                user_id=db_user.id,
-                submissions=Submissions(
-                    easy=stats.submissions.easy,
-                    medium=stats.submissions.medium,
-                    hard=stats.submissions.hard,
-                    score=stats.submissions.score,
-                ),
-                languages_problem_count=languages_problem_count,
-                skills_problem_count=skills_problem_count,
+    return record
+
+
+def encode_record_breakdown(db_user: User, record: Record) -> None:
+    """
+    Replace a record's full breakdowns with the entries that changed since the user's
+    previous record, unless the record is a keyframe.
+
+    A record is a keyframe on keyframe days, or if the user's previous breakdown isn't
+    known.
+
+    :param db_user: The user the record belongs to, whose latest breakdown is updated.
+    :param record: The record, with its full breakdowns.
+    """
+    breakdown = Breakdown(
+        languages_problem_count=record.languages_problem_count,
+        skills_problem_count=record.skills_problem_count,
+    )
+
+    if db_user.last_breakdown and not is_keyframe_day(record.timestamp):
+        delta = breakdown_delta(db_user.last_breakdown, breakdown)
+
+        record.keyframe = False
+        record.languages_problem_count = delta.languages_problem_count
+        record.skills_problem_count = delta.skills_problem_count
+
+    db_user.last_breakdown = breakdown
+
+
+async def score_last_changed_from_records(db_user: User) -> datetime:
+    """
+    Estimate when a user's score last changed from their record history.
+
+    Used for users whose score changes haven't been tracked yet.
+
+    :param db_user: The user, with their current score.
+
+    :return: The day after the latest record with a different score, or the timestamp
+    of their earliest record if the score never changed.
+    """
+    scores = await record_scores(db_user.id, EPOCH)
+
+    for timestamp, score in reversed(scores):
+        if score != db_user.stats.submissions.score:
+            return timestamp + timedelta(days=1)
+
+    if scores:
+        return scores[0][0]
+
+    return datetime.now(UTC)
+
+
+class StatsRefreshProgress:
+    """
+    Tracks the progress of a stats refresh, logging and reporting it periodically.
+
+    :param bot: The Discord bot instance.
+    :param report_every: The number of users between progress reports.
+    """
+
+    def __init__(self, bot: "DiscordBot", report_every: int = 1000) -> None:
+        self.bot = bot
+        self.report_every = report_every
+        self.total = 0
+        self.done = 0
+
+    def advance(self, count: int) -> None:
+        """
+        Record that users have been processed.
+
+        :param count: The number of users processed.
+        """
+        reported = self.done // self.report_every
+        self.done += count
+
+        if self.done // self.report_every > reported or self.done >= self.total:
+            self.bot.logger.info(
+                f"User stats update progress | {self.done} / {self.total} users"
             )
+            statsd.gauge("stats.refresh.users.done", self.done)
+
+
+class StatsRefreshCheckpoint:
+    """
+    Tracks the last user of a stats refresh below which every batch has been applied,
+    and saves it to the refresh job once written.
+
+    Batches complete out of order, so the checkpoint only advances over batches whose
+    predecessors have all completed.
+
+    :param job: The refresh job.
+    :param writer: The writer that is flushed before each checkpoint is saved.
+    :param save_every: The number of batches between saved checkpoints.
+    """
+
+    def __init__(
+        self,
+        job: RefreshJob,
+        writer: StatsWriter,
+        save_every: int = STATS_CHECKPOINT_INTERVAL,
+    ) -> None:
+        self.job = job
+        self.writer = writer
+        self.save_every = save_every
+
+        # Last user id of each completed batch that is ahead of the checkpoint.
+        self.completed: dict[int, int] = {}
+        self.next_sequence = 0
+        self.last_user_id: int | None = None
+        self.lock = asyncio.Lock()
+
+    async def complete(self, sequence: int, last_user_id: int) -> None:
+        """
+        Record that a batch has been applied, saving the checkpoint periodically.
+
+        :param sequence: The position of the batch in the refresh.
+        :param last_user_id: The id of the last user in the batch.
+        """
+        self.completed[sequence] = last_user_id
+
+        while self.next_sequence in self.completed:
+            self.last_user_id = self.completed.pop(self.next_sequence)
+            self.next_sequence += 1
+
+            if self.next_sequence % self.save_every == 0:
+                await self.save()
+
+    async def save(self) -> None:
+        """
+        Write the queued updates, then save the checkpoint.
+        """
+        async with self.lock:
+            last_user_id = self.last_user_id
+            if last_user_id is None or last_user_id == self.job.last_user_id:
+                return
+
+            await self.writer.flush()
+            await save_user_checkpoint(self.job, last_user_id)
+
+
+def users_due_for_refresh(now: datetime) -> FindMany[User]:
+    """
+    Find the users whose stats are due to be refreshed, based on their refresh tier.
+
+    A user's tier depends on how long ago their score last changed, and each tier is
+    refreshed at its own interval. Users whose score changes haven't been tracked yet
+    are always due.
+
+    :param now: The time of the refresh.
+
+    :return: The query of the users due to be refreshed.
+    """
+    tier_conditions = []
+    for i, tier in enumerate(REFRESH_TIERS):
+        conditions = [
+            User.score_last_changed <= now - tier.inactive_for,
+            User.last_updated <= now - tier.interval + REFRESH_DUE_SLACK,
+        ]
+
+        if i + 1 < len(REFRESH_TIERS):
+            next_tier = REFRESH_TIERS[i + 1]
+            conditions.append(User.score_last_changed > now - next_tier.inactive_for)
+
+        tier_conditions.append(And(*conditions))
+
+    return User.find(
+        Or(User.score_last_changed == None, *tier_conditions)  # noqa: E711
+    )
+
+
+def compute_server_winners(
+    server_members: dict[int, list[int]], scores: dict[int, int]
+) -> dict[int, set[int]]:
+    """
+    Find the winners of each server for a period.
+
+    A server's winners are its members with the highest score, and a server has no
+    winners if that score isn't positive, as scores of 0 don't count as a win.
+
+    :param server_members: The ids of each server's members, keyed by server id.
+    :param scores: The users' scores for the period, keyed by user id. Users without a
+    score are skipped.
+
+    :return: The ids of each server's winners, keyed by server id. Servers without
+    winners are omitted.
+    """
+    server_winners: dict[int, set[int]] = {}
+
+    for server_id, user_ids in server_members.items():
+        member_scores = [
+            (user_id, scores[user_id]) for user_id in user_ids if user_id in scores
+        ]
+        if not member_scores:
+            continue
 
-            await record.create()
+        max_score = max(score for _, score in member_scores)
+        if max_score <= 0:
+            continue
+
+        server_winners[server_id] = {
+            user_id for user_id, score in member_scores if score == max_score
+        }
+
+    return server_winners
+
+
+async def all_server_members() -> dict[int, list[int]]:
+    """
+    Map every server to its members in a single scan of the profiles.
+
+    :return: The ids of each server's members, keyed by server id.
+    """
+    server_members: dict[int, list[int]] = {}
+
+    async for profile in Profile.aggregate(
+        [{"$project": {"_id": 0, "server_id": 1, "user_id": 1}}]
+    ):
+        server_members.setdefault(profile["server_id"], []).append(profile["user_id"])
 
-        db_user.last_updated = datetime.now(UTC)
-        await db_user.save()
+    return server_members
 
 
 async def update_wins(
@@ -131,102 +435,202 @@ async def update_wins(
 ) -> None:
     """
     Update the win counts for all users in all servers.
-    """
-    all_users = await User.all().to_list()
 
+    The previous period's scores are computed once per period, the winners of every
+    server are found in memory, and the win counts are written in a single bulk write.
+    """
     # Map periods to their respective reset flags and increment fields.
     periods_and_resets = (
-        (Period.DAY, reset_day, Profile.win_count.days),
-        (Period.WEEK, reset_week, Profile.win_count.weeks),
-        (Period.MONTH, reset_month, Profile.win_count.months),
+        (Period.DAY, reset_day, "win_count.days"),
+        (Period.WEEK, reset_week, "win_count.weeks"),
+        (Period.MONTH, reset_month, "win_count.months"),
     )
 
-    # Collect scores of all users for each period.
-    user_to_score: dict[Period, dict[int, int]] = {}
-    for period, reset, _ in periods_and_resets:
+    server_members = await all_server_members()
+
+    # {(server_id, user_id): {increment_field: 1}}
+    increments: dict[tuple[int, int], dict[str, int]] = {}
+    for period, reset, increment_field in periods_and_resets:
         if not reset:
             continue
 
-        users_and_scores = await all_users_scores_and_wins(
-            all_users, period, previous=True
-        )
-        user_to_score[period] = {user.id: score for user, score, _ in users_and_scores}
+        scores = await previous_period_scores(period)
+        server_winners = compute_server_winners(server_members, scores)
 
-    async for db_server in Server.all():
-        db_profiles = await Profile.find_many(
-            Profile.server_id == db_server.id
-        ).to_list()
-        user_ids: list[int] = [profile.user_id for profile in db_profiles]
+        for server_id, winners in server_winners.items():
+            for user_id in winners:
+                increments.setdefault((server_id, user_id), {})[increment_field] = 1
 
-        # Could occur for global server with ID 0. Prevents error from occurring when
-        # max is used.
-        if not user_ids:
-            continue
-
-        # Update win counts for the profiles.
-        for period, reset, increment_field in periods_and_resets:
-            if not reset:
-                continue
+    if not increments:
+        return
 
-            max_score = max(
-                [
-                    user_to_score[period][user]
-                    for user in user_ids
-                    if user in user_to_score[period]
-                ]
+    now = datetime.now(UTC)
+    await Profile.get_motor_collection().bulk_write(
+        [
+            UpdateOne(
+                {"server_id": server_id, "user_id": user_id},
+                {"$inc": inc, "$set": {"win_count.last_updated": now}},
             )
-            # Scores of 0 don't count as a win.
-            if max_score <= 0:
-                continue
-
-            winners = {
-                user_id
-                for user_id, score in user_to_score[period].items()
-                if score == max_score
-            }
-
-            await Profile.find_many(
-                Profile.server_id == db_server.id, In(Profile.user_id, winners)
-            ).update(
-                Inc({increment_field: 1}),
-                Set({Profile.win_count.last_updated: datetime.now(UTC)}),
-            )  # type: ignore
+            for (server_id, user_id), inc in increments.items()
+        ],
+        ordered=False,
+    )
 
 
 async def update_all_user_stats(
     bot: "DiscordBot",
-    reset_day: bool = False,
-    reset_week: bool = False,
-    reset_month: bool = False,
+    job: RefreshJob,
+    batch_size: int = USER_STATS_BATCH_SIZE,
+    workers: int = STATS_REFRESH_WORKERS,
+    resumed: bool = False,
 ) -> None:
     """
-    Update stats for all users.
+    Update stats for all users, and their win counts if the job resets any periods.
 
-    :param reset_day: Whether the day needs resetting.
-    """
+    Outside of period resets, only the users whose refresh tier is due are updated.
 
-    counter = 0
-    tasks = []
-    async for db_user in User.all():
-        task = asyncio.create_task(update_stats(bot, db_user, reset_day))
-        tasks.append(task)
+    Users are streamed from a cursor into a bounded queue of batches, which a fixed
+    number of workers fetch and apply, and the results are written in bulk by the
+    writer. Memory use therefore doesn't grow with the number of users.
 
-    total_users = len(tasks)
-    for completed_task in asyncio.as_completed(tasks):
-        await completed_task
-        counter += 1
-        # if counter % 200 == 0 or counter == total_users:
-        #     bot.logger.info(f"{counter} / {total_users} users stats updated")
+    Users are refreshed in ascending id order, checkpointing the job as batches are
+    written, so that an interrupted job resumes after the last written user.
+
+    :param job: The refresh job, with the periods it resets.
+    :param batch_size: The maximum number of users to fetch per request.
+    :param workers: The number of batches fetched concurrently.
+    :param resumed: Whether the job was interrupted by a restart and is being resumed.
+    """
+    reset_day, reset_week, reset_month = job.reset_day, job.reset_week, job.reset_month
+    writer = StatsWriter(bot)
 
-    bot.logger.info(f"User stats update completed | Total users: {total_users}")
+    if not phase_completed(job, RefreshPhase.STATS):
+        await stream_user_stats(bot, job, writer, batch_size, workers)
+        await complete_phase(job, RefreshPhase.STATS)
 
-    if reset_day or reset_week or reset_month:
+    if (reset_day or reset_week or reset_month) and not phase_completed(
+        job, RefreshPhase.WINS
+    ):
         await update_wins(reset_day, reset_week, reset_month)
+        await invalidate_period_leaderboard_snapshots(
+            *(
+                period
+                for period, reset in (
+                    (Period.DAY, reset_day),
+                    (Period.WEEK, reset_week),
+                    (Period.MONTH, reset_month),
+                )
+                if reset
+            )
+        )
+        await complete_phase(job, RefreshPhase.WINS)
         bot.logger.info(
             "User wins update completed | Reset periods applied - "
             f"Day: {reset_day}, Week: {reset_week}, Month: {reset_month}"
         )
 
+    if resumed:
+        # The users refreshed before the restart aren't known, so every stored
+        # leaderboard is rebuilt.
+        server_ids = await LeaderboardSnapshot.distinct("server_id")
+    else:
+        server_ids = await Profile.distinct(
+            "server_id", {"user_id": {"$in": list(writer.score_changed_user_ids)}}
+        )
+    await rebuild_leaderboard_snapshots(server_ids)
+    bot.logger.info(
+        f"Leaderboard snapshots rebuild completed | Servers: {len(server_ids)}"
+    )
+
+
+async def stream_user_stats(
+    bot: "DiscordBot",
+    job: RefreshJob,
+    writer: StatsWriter,
+    batch_size: int,
+    workers: int,
+) -> None:
+    """
+    Refresh the stats of the users due in a refresh job, starting after its checkpoint.
+
+    :param job: The refresh job.
+    :param writer: The writer the updated stats and records are queued in.
+    :param batch_size: The maximum number of users to fetch per request.
+    :param workers: The number of batches fetched concurrently.
+    """
+    batches: asyncio.Queue[tuple[int, list[User]] | None] = asyncio.Queue(
+        maxsize=STATS_REFRESH_QUEUE_SIZE
+    )
+    progress = StatsRefreshProgress(bot)
+    checkpoint = StatsRefreshCheckpoint(job, writer)
+
+    # Period resets write the records that leaderboards are computed from, so every
+    # user must be refreshed regardless of their activity.
+    full_refresh = job.reset_day or job.reset_week or job.reset_month
+    db_users = User.all() if full_refresh else users_due_for_refresh(datetime.now(UTC))
+
+    # Users after the checkpoint may have been written before the job was interrupted,
+    # so they're skipped if they already have today's record.
+    recorded_user_ids: set[int] = set()
+    if job.last_user_id is not None:
+        db_users = db_users.find(User.id > job.last_user_id)
+
+        if job.reset_day:
+            today = datetime.now(UTC).replace(hour=0, minute=0, second=0, microsecond=0)
+            recorded_user_ids = set(
+                await Record.distinct("user_id", {"timestamp": today})
+            )
+
+        bot.logger.info(
+            f"User stats update resumed | Last user ID: {job.last_user_id} | "
+            f"Already recorded: {len(recorded_user_ids)}"
+        )
+
+    progress.total = await db_users.count()
+    statsd.gauge(
+        "stats.refresh.users.count",
+        progress.total,
+        tags=[f"refresh:{'full' if full_refresh else 'incremental'}"],
+    )
+
+    async def produce() -> None:
+        sequence = 0
+        batch: list[User] = []
+        async for db_user in db_users.sort(+User.id):  # type: ignore
+            if db_user.id in recorded_user_ids:
+                continue
+
+            batch.append(db_user)
+            if len(batch) == batch_size:
+                await batches.put((sequence, batch))
+                sequence += 1
+                batch = []
+
+        if batch:
+            await batches.put((sequence, batch))
+
+        # One sentinel per worker, to stop them once the queue is drained.
+        for _ in range(workers):
+            await batches.put(None)
+
+    async def consume() -> None:
+        while (item := await batches.get()) is not None:
+            sequence, batch = item
+            try:
+                await update_stats_batch(bot, batch, writer, job.reset_day, batch_size)
+            except Exception:
+                bot.logger.exception(
+                    f"User stats batch update failed | Users: {len(batch)}"
+                )
+
+            progress.advance(len(batch))
+            await checkpoint.complete(sequence, batch[-1].id)
+
+    await asyncio.gather(produce(), *(consume() for _ in range(workers)))
+    await writer.flush()
+
+    bot.logger.info(f"User stats update completed | Total users: {progress.done}")
+
 
 async def stats_card(
     bot: "DiscordBot",
@@ -0,0 +1,170 @@
+import time
+from typing import TYPE_CHECKING
+
+from datadog.dogstatsd.base import statsd
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from src.database.models import Record, User
+
+if TYPE_CHECKING:
+    # To prevent circular imports
+    from src.bot import DiscordBot
+
+USER_BULK_WRITE_BATCH_SIZE = 500
+RECORD_INSERT_BATCH_SIZE = 500
+
+
+class StatsWriter:
+    """
+    Collects the user stat updates and records produced by a stats refresh, and writes
+    them in bulk rather than with one round trip per document.
+
+    Writes are unordered, so a document that fails to be written doesn't prevent the
+    rest of its batch from being written.
+
+    :param bot: The Discord bot instance.
+    :param user_batch_size: The number of user updates per `bulk_write`.
+    :param record_batch_size: The number of records per `insert_many`.
+    """
+
+    def __init__(
+        self,
+        bot: "DiscordBot",
+        user_batch_size: int = USER_BULK_WRITE_BATCH_SIZE,
+        record_batch_size: int = RECORD_INSERT_BATCH_SIZE,
+    ) -> None:
+        self.bot = bot
+        self.user_batch_size = user_batch_size
+        self.record_batch_size = record_batch_size
+
+        self.user_updates: list[UpdateOne] = []
+        self.records: list[Record] = []
+        # Ids of the users whose score changed, used to find the leaderboards to
+        # rebuild once the refresh is written.
+        self.score_changed_user_ids: set[int] = set()
+
+    async def add_user(self, db_user: User) -> None:
+        """
+        Queues the refreshed stats of a user, flushing the queued updates once a batch
+        is full.
+
+        :param db_user: The user with their refreshed stats.
+        """
+        self.user_updates.append(
+            UpdateOne(
+                {"_id": db_user.id},
+                {
+                    "$set": {
+                        "stats.submissions": db_user.stats.submissions.model_dump(),
+                        "last_updated": db_user.last_updated,
+                        "score_last_changed": db_user.score_last_changed,
+                        "period_scores": (
+                            db_user.period_scores.model_dump()
+                            if db_user.period_scores
+                            else None
+                        ),
+                        "last_breakdown": (
+                            db_user.last_breakdown.model_dump()
+                            if db_user.last_breakdown
+                            else None
+                        ),
+                    }
+                },
+            )
+        )
+
+        if len(self.user_updates) >= self.user_batch_size:
+            # The users' records are written first, see `flush`.
+            await self.flush()
+
+    async def add_record(self, record: Record) -> None:
+        """
+        Queues a record, flushing the queued records once a batch is full.
+
+        :param record: The record to insert.
+        """
+        self.records.append(record)
+
+        if len(self.records) >= self.record_batch_size:
+            await self.flush_records()
+
+    async def flush(self) -> None:
+        """
+        Writes every queued record, then every queued user update.
+
+        Records are written before the users whose breakdowns and period scores they
+        advance. An interrupted refresh then leaves at worst a written record with an
+        out of date user, whose refresh is skipped on resume and whose period scores
+        are reloaded from the records. The reverse would leave a user ahead of a
+        missing record, and the resumed refresh would record an empty breakdown delta.
+        """
+        await self.flush_records()
+        await self.flush_users()
+
+    async def flush_users(self) -> None:
+        """
+        Writes the queued user updates in a single `bulk_write`.
+        """
+        # Swap the queue out before awaiting, so updates queued whilst writing are kept
+        # for the next batch.
+        user_updates, self.user_updates = self.user_updates, []
+        if not user_updates:
+            return
+
+        start = time.perf_counter()
+        try:
+            await User.get_motor_collection().bulk_write(user_updates, ordered=False)
+        except BulkWriteError as e:
+            self.log_write_errors("users", e)
+
+        self.report("users", len(user_updates), time.perf_counter() - start)
+
+    async def flush_records(self) -> None:
+        """
+        Writes the queued records in a single `insert_many`.
+        """
+        records, self.records = self.records, []
+        if not records:
+            return
+
+        start = time.perf_counter()
+        try:
+            await Record.insert_many(records, ordered=False)
+        except BulkWriteError as e:
+            self.log_write_errors("records", e)
+
+        self.report("records", len(records), time.perf_counter() - start)
+
+    def log_write_errors(self, collection: str, error: BulkWriteError) -> None:
+        """
+        Logs the documents of a batch that failed to be written.
+
+        :param collection: The collection written to.
+        :param error: The error raised by the unordered bulk write.
+        """
+        write_errors = error.details.get("writeErrors", [])
+
+        self.bot.logger.error(
+            f"Bulk write partially failed | Collection: {collection} | "
+            f"Failed: {len(write_errors)} | "
+            f"First error: {write_errors[0]['errmsg'] if write_errors else None}"
+        )
+        statsd.increment(
+            "db.bulk_write.errors",
+            len(write_errors),
+            tags=[f"collection:{collection}"],
+        )
+
+    def report(self, collection: str, batch_size: int, duration: float) -> None:
+        """
+        Reports the latency and size of a written batch to Datadog.
+
+        :param collection: The collection written to.
+        :param batch_size: The number of documents in the batch.
+        :param duration: The time taken to write the batch, in seconds.
+        """
+        tags = [f"collection:{collection}"]
+
+        statsd.timing("db.bulk_write.duration", duration, tags=tags)
+        statsd.histogram("db.bulk_write.batch_size", batch_size, tags=tags)
@@ -7,7 +7,16 @@ from typing import TYPE_CHECKING, Awaitable, Callable, Optional
 import discord
 
 from src.constants import GLOBAL_LEADERBOARD_ID
-from src.database.models import Preference, Profile, Record, Stats, Submissions, User
+from src.database.models import (
+    PeriodScores,
+    Preference,
+    Profile,
+    Record,
+    RecordRollup,
+    Stats,
+    Submissions,
+    User,
+)
 from src.ui.embeds.users import (
     connect_account_instructions_embed,
     profile_added_embed,
@@ -15,6 +24,10 @@ from src.ui.embeds.users import (
     user_already_added_in_server_embed,
 )
 from src.utils.common import convert_to_score
+from src.utils.leaderboard_snapshots import (
+    invalidate_leaderboard_snapshots,
+    invalidate_user_leaderboard_snapshots,
+)
 from src.utils.problems import fetch_problems_solved_and_rank
 from src.utils.roles import give_verified_role
 
@@ -61,6 +74,8 @@ async def register(
         hard=stats.submissions.hard,
     )
 
+    today = datetime.now(UTC).replace(hour=0, minute=0, second=0, microsecond=0)
+
     user = User(
         id=user_id,
         leetcode_id=leetcode_id,
@@ -72,10 +87,14 @@ async def register(
                 score=score,
             )
         ),
+        # Today's record is the first record of every period.
+        period_scores=PeriodScores(
+            as_of=today, day_start=score, week_start=score, month_start=score
+        ),
     )
 
     record = Record(
-        timestamp=datetime.now(UTC).replace(hour=0, minute=0, second=0, microsecond=0),
+        timestamp=today,
         user_id=user_id,
         submissions=Submissions(
             easy=stats.submissions.easy,
@@ -108,6 +127,7 @@ async def register(
     await record.create()
     await profile_server.create()
     await profile_global.create()
+    await invalidate_leaderboard_snapshots(server_id, GLOBAL_LEADERBOARD_ID)
 
     await give_verified_role(guild, member)
 
@@ -151,6 +171,7 @@ async def login(
         )
 
         await db_profile.create()
+        await invalidate_leaderboard_snapshots(server_id)
 
         embed = synced_existing_user_embed()
         await send_message(embed=embed)
@@ -208,12 +229,15 @@ async def unlink_user_from_server(user_id: int, server_id: int) -> None:
     await Profile.find_many(
         Profile.user_id == user_id, Profile.server_id == server_id
     ).delete()
+    await invalidate_leaderboard_snapshots(server_id)
 
 
 async def delete_user(user_id: int) -> None:
     """
     Deletes all of user's stored information.
     """
+    await invalidate_user_leaderboard_snapshots(user_id)
     await Profile.find_many(Profile.user_id == user_id).delete()
     await Record.find_many(Record.user_id == user_id).delete()
+    await RecordRollup.find_many(RecordRollup.user_id == user_id).delete()
     await User.find_one(User.id == user_id).delete()
@@ -0,0 +1,31 @@
+from src.utils.stats import compute_server_winners
+
+
+def test_winners_only_come_from_their_own_server():
+    # Users 2 and 3 are members of both servers, whilst user 1 is only in server 10
+    # and user 4 is only in server 20.
+    server_members = {10: [1, 2, 3], 20: [2, 3, 4]}
+    scores = {1: 50, 2: 30, 3: 10, 4: 40}
+
+    winners = compute_server_winners(server_members, scores)
+
+    assert winners == {10: {1}, 20: {4}}
+
+
+def test_shared_member_wins_every_server_they_lead():
+    server_members = {10: [1, 2], 20: [2, 3]}
+    scores = {1: 10, 2: 30, 3: 20}
+
+    winners = compute_server_winners(server_members, scores)
+
+    assert winners == {10: {2}, 20: {2}}
+
+
+def test_ties_and_servers_without_positive_scores():
+    server_members = {10: [1, 2, 3], 20: [3, 4], 30: [5]}
+    scores = {1: 20, 2: 20, 3: 0, 4: 0}
+
+    winners = compute_server_winners(server_members, scores)
+
+    # Server 20 only has scores of 0, and server 30's member has no score.
+    assert winners == {10: {1, 2}}